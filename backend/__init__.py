@@ -1,17 +1,31 @@
 import logging
+import math
 import re
+import requests
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from flask_compress import Compress
 
 from .routes.auth import bp_auth
 from .routes.releases import bp_releases
 from .routes.scanner import bp_scanner
+from .routes.diagnostics import bp_diagnostics
+from .services import scan_jobs, release_stats, release_search
+from .utils import fastjson, metrics, tracing
+from .utils.supabase_client import SupabaseUnavailable
+from .utils.passwords import PasswordHasherBusy
+from .services.release_search import SearchIndexNotReady
 
 def create_app():
     app = Flask(__name__)
+    # orjson-backed jsonify when available
+    fastjson.install(app)
+    # Request counts/latency per route, flushed to the local store for /metrics
+    metrics.install(app)
+    # Server-Timing and request traces; registered before the compressor so the
+    # header includes its time
+    tracing.install(app)
     # Enable gzip compression
-    Compress(app)
+    tracing.TracedCompress(app)
     
     # Configure CORS
     CORS(
@@ -26,7 +40,7 @@ def create_app():
                     re.compile(r"http://127\.0\.0\.1:\\d+"),
                 ],
                 "methods": ["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
-                "allow_headers": ["Content-Type", "Authorization"],
+                "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
             }
         },
         supports_credentials=True,
@@ -46,12 +60,14 @@ def create_app():
             or origin.startswith("http://127.0.0.1:")
         ):
             response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers["Timing-Allow-Origin"] = origin
             # Ensure caches vary by Origin
             response.headers["Vary"] = "Origin"
         # Methods/headers and credentials for preflight and actual responses
         response.headers["Access-Control-Allow-Methods"] = "GET, POST, PATCH, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, If-None-Match"
         response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Access-Control-Expose-Headers"] = "X-Scan-Enriched, X-Scan-Timed-Out, X-Scan-Cache, X-Scan-Reused, Link, X-Next-Cursor, ETag, X-Releases-Cache, Server-Timing, X-Trace-Id"
         
         # Add short-lived caching for safe GET endpoints
         if request.method == "GET" and request.path in ("/releases", "/admin/users", "/me"):
@@ -68,6 +84,33 @@ def create_app():
     
     logging.basicConfig(level=logging.INFO)
 
+    # Upstream failures that escape a route: fail fast with 503 while Supabase is
+    # unavailable (breaker open / budget spent), 502 for a failed request
+    @app.errorhandler(SupabaseUnavailable)
+    def supabase_unavailable(e):
+        resp = jsonify({"error": "database temporarily unavailable"})
+        resp.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+        return resp, 503
+
+    # Login/register burst beyond the bcrypt pool's queue: shed load quickly
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        resp = jsonify({"error": "too many sign-in attempts in progress, retry shortly"})
+        resp.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+        return resp, 503
+
+    # First searches after a worker starts, while its index is still loading
+    @app.errorhandler(SearchIndexNotReady)
+    def search_index_not_ready(e):
+        resp = jsonify({"error": "search index is loading, retry shortly"})
+        resp.headers["Retry-After"] = str(max(1, math.ceil(e.retry_after)))
+        return resp, 503
+
+    @app.errorhandler(requests.RequestException)
+    def upstream_request_failed(e):
+        logging.error("Upstream request failed: %s", str(e))
+        return jsonify({"error": "upstream request failed"}), 502
+
     # Health and root
     @app.get("/")
     def root_index():
@@ -81,5 +124,11 @@ def create_app():
     app.register_blueprint(bp_auth)
     app.register_blueprint(bp_releases)
     app.register_blueprint(bp_scanner)
+    app.register_blueprint(bp_diagnostics)
+
+    # Resume any queued or orphaned scan jobs left in the local store
+    scan_jobs.ensure_workers()
+    release_stats.ensure_reconciler()
+    release_search.ensure_index()
 
     return app
@@ -0,0 +1,151 @@
+"""Compare ways of serving a large PostgREST listing: decode + re-encode vs pass-through.
+
+Usage (from backend/):
+    python benchmarks/bench_listing.py                  # 10k and 100k rows
+    python benchmarks/bench_listing.py --rows 250000
+
+Synthetic release rows are written to benchmarks/fixtures/ on first use and
+served by a local HTTP server standing in for PostgREST. Each (size, mode)
+pair runs in a fresh interpreter so peak RSS is not polluted by earlier runs:
+
+    stdlib       r.json() + Flask's default jsonify (the previous code path)
+    orjson       utils.fastjson.loads + the orjson-backed jsonify provider
+    passthrough  utils.supabase_client.passthrough, body streamed in 64 KiB chunks
+
+Timings cover fetching the body from the local server and producing every
+response byte (consumed the way a WSGI server would write them).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+MODES = ("stdlib", "orjson", "passthrough")
+STATUSES = ["Planned", "In Development", "Released", "Archived"]
+
+
+def fixture_path(rows):
+    path = os.path.join(FIXTURES_DIR, f"releases-{rows}.json")
+    if not os.path.exists(path):
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        data = [
+            {
+                "id": i,
+                "user_id": f"00000000-0000-0000-0000-{i % 97:012d}",
+                "project_name": f"project-{i % 5000}",
+                "version": f"{i % 7}.{i % 13}.{i % 29}",
+                "status": STATUSES[i % 4],
+                "created_at": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T12:{i % 60:02d}:00.{i % 1000000:06d}+00:00",
+            }
+            for i in range(rows, 0, -1)
+        ]
+        with open(path, "w") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+    return path
+
+
+def _serve(path):
+    with open(path, "rb") as fh:
+        body = fh.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def worker(mode, path, repeat):
+    os.environ["SUPABASE_URL"] = _serve(path)
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+    os.environ.setdefault("JWT_SECRET", "bench")
+    sys.path.insert(0, BACKEND_DIR)
+    from flask import Flask
+    from utils import fastjson, supabase_client as sb
+
+    app = Flask(__name__)
+    if mode == "orjson":
+        fastjson.install(app)
+
+    def run():
+        with app.app_context():
+            if mode == "passthrough":
+                resp = sb.passthrough(sb.get("releases", stream=True))
+            else:
+                r = sb.get("releases")
+                rows = r.json() if mode == "stdlib" else fastjson.loads(r.content)
+                resp = app.json.response(rows)
+            sent = 0
+            for chunk in resp.response:
+                sent += len(chunk)
+            resp.close()
+            return sent
+
+    run()  # warm the connection pool and imports
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    sent = run()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    print(json.dumps({
+        "bytes": sent,
+        "traced_peak_kib": traced_peak // 1024,
+        "rss_growth_kib": rss_after - rss_before,  # ru_maxrss is KiB on Linux
+        "median_ms": statistics.median(timings),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", nargs="*", type=int, default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], args.worker[1], args.repeat)
+        return
+
+    print(f"{'rows':>8}{'body KiB':>10}  {'mode':<12}{'median ms':>10}{'traced KiB':>12}{'RSS +KiB':>10}")
+    for rows in args.rows:
+        path = fixture_path(rows)
+        size = os.path.getsize(path) // 1024
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", mode, path, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out)
+            print(f"{rows:>8}{size:>10}  {mode:<12}{r['median_ms']:>10.1f}{r['traced_peak_kib']:>12}{r['rss_growth_kib']:>10}")
+
+
+if __name__ == "__main__":
+    main()
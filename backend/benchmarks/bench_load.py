@@ -0,0 +1,740 @@
+"""End-to-end load test: create_app under gunicorn against local Supabase and PyPI stand-ins.
+
+Usage (from backend/):
+    python benchmarks/bench_load.py                          # mixed traffic, 30 s
+    python benchmarks/bench_load.py --mix browse --concurrency 32
+    python benchmarks/bench_load.py --mix "releases=70,login=30" --duration 60
+    python benchmarks/bench_load.py --save baseline.json     # record a baseline
+    python benchmarks/bench_load.py --baseline baseline.json # compare against it
+
+Nothing leaves the machine. The harness starts:
+
+    PostgREST    a SQLite-backed stand-in for /rest/v1 with the parts the routes
+                 use: select, order, limit/offset, eq/neq/gt/gte/lt/lte/ilike/in/is
+                 filters (also nested in or=(...)/and(...)), POST/PATCH/DELETE and
+                 Prefer: return=representation. Unsupported syntax answers 400 so a
+                 route that starts using it fails loudly instead of silently.
+    PyPI         /pypi/<name>/json with --pypi-latency-ms (uniformly jittered
+                 +-50%), ETag / If-None-Match revalidation and a realistic
+                 "releases" map that the app has to skip over
+    gunicorn     wsgi:app with --workers x --threads gthread workers, pointed at
+                 both stand-ins through SUPABASE_URL and PYPI_BASE_URL
+
+Users, releases and password hashes (at --bcrypt-rounds, the same cost the app is
+configured with, so logins never trigger a rehash) are seeded straight into the
+stand-in. Client processes then run closed-loop virtual users, each logged in as
+its own seeded user, for --warmup (not recorded) plus --duration seconds. The
+report lists requests/s, error counts and p50/p95/p99/max latency per operation
+and overall. Latencies include the client's own overhead, which is why clients
+run in separate processes from the server and the stand-ins.
+
+Operations (weights come from a named mix or --mix name=weight,...):
+
+    login     POST /login (bcrypt verify)
+    me        GET /me
+    releases  GET /releases (first page)
+    search    GET /releases/search?q=<prefix of a seeded project>
+    stats     GET /releases/stats
+    create    POST /releases (as admin)
+    update    PATCH /releases/<id> (one of the user's seeded releases)
+    scan      POST /scan?stream=1 with a requirements.txt of --scan-packages
+              packages drawn from --package-pool names (the frontend's mode)
+    import    POST /releases/import-scan with the same kind of rows
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit
+
+import bcrypt
+import requests
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+USERS_TABLE = "user_details"
+RELEASES_TABLE = "releases"
+STATUSES = ["Planned", "In Development", "Released", "Archived"]
+PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@bench.local"
+
+MIXES = {
+    "mixed": {"login": 3, "me": 10, "releases": 35, "search": 15, "stats": 7, "create": 3, "update": 12, "scan": 10, "import": 5},
+    "browse": {"me": 15, "releases": 50, "search": 20, "stats": 10, "update": 5},
+    "login": {"login": 100},
+    "scan": {"scan": 70, "import": 30},
+}
+
+# -- PostgREST stand-in -----------------------------------------------------
+
+SCHEMA = f"""
+CREATE TABLE {USERS_TABLE} (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT UNIQUE,
+    role TEXT,
+    password_hash TEXT,
+    created_at TEXT
+);
+CREATE TABLE {RELEASES_TABLE} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    project_name TEXT,
+    version TEXT,
+    status TEXT,
+    created_at TEXT
+);
+CREATE INDEX releases_user ON {RELEASES_TABLE} (user_id, created_at, id);
+CREATE INDEX releases_created ON {RELEASES_TABLE} (created_at, id);
+"""
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "or", "and"}
+COMPARISONS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_IDENT = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class QueryError(Exception):
+    pass
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split_top(s):
+    # Splits "a,and(b,c),d" on commas outside parentheses and double quotes
+    parts, depth, quoted, escaped, start = [], 0, False, False, 0
+    for i, ch in enumerate(s):
+        if escaped:
+            escaped = False
+        elif ch == "\\" and quoted:
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(s[start:i])
+            start = i + 1
+    parts.append(s[start:])
+    return parts
+
+
+def _literal(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+class Table:
+    def __init__(self, conn, name):
+        self.name = name
+        self.columns = [row[1] for row in conn.execute(f"PRAGMA table_info({name})")]
+
+    def column(self, name):
+        if not _IDENT.match(name) or name not in self.columns:
+            raise QueryError(f"column {self.name}.{name} does not exist")
+        return name
+
+
+def _condition(table, column, expr, params):
+    # One "op.value" filter on column -> SQL, appending bound values to params
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, value = expr.partition(".")
+    col = table.column(column)
+    if op in COMPARISONS:
+        params.append(_literal(value))
+        sql = f"{col} {COMPARISONS[op]} ?"
+    elif op == "ilike":
+        params.append(_literal(value).replace("*", "%"))
+        sql = f"{col} LIKE ? ESCAPE '\\'"
+    elif op == "in":
+        if not (value.startswith("(") and value.endswith(")")):
+            raise QueryError(f"malformed in. filter: {value}")
+        items = [_literal(v) for v in _split_top(value[1:-1]) if v != ""]
+        params.extend(items)
+        sql = f"{col} IN ({','.join('?' * len(items))})" if items else "0"
+    elif op == "is" and value in ("null", "true", "false"):
+        sql = f"{col} IS {value.upper()}"
+    else:
+        raise QueryError(f"unsupported operator: {op}")
+    return f"NOT ({sql})" if negate else sql
+
+
+def _logical(table, joiner, body, params):
+    # "(a.eq.1,and(b.lt.2,c.gt.3))" -> SQL
+    if not (body.startswith("(") and body.endswith(")")):
+        raise QueryError(f"malformed logical filter: {body}")
+    terms = []
+    for item in _split_top(body[1:-1]):
+        negate = item.startswith("not.")
+        if negate:
+            item = item[4:]
+        if item.startswith(("and(", "or(")):
+            name, _, rest = item.partition("(")
+            sql = _logical(table, name.upper(), "(" + rest, params)
+        else:
+            column, _, expr = item.partition(".")
+            sql = _condition(table, column, expr, params)
+        terms.append(f"NOT ({sql})" if negate else sql)
+    return "(" + f" {joiner} ".join(terms) + ")"
+
+
+def parse_query(table, query):
+    # -> (columns, where, params, order, limit, offset)
+    columns, where, params, order, limit, offset = "*", [], [], "", None, None
+    for pair in filter(None, query.split("&")):
+        key, _, value = pair.partition("=")
+        key, value = unquote(key), unquote(value)
+        if key == "select":
+            if value != "*":
+                columns = ",".join(table.column(c.strip()) for c in value.split(","))
+        elif key == "order":
+            terms = []
+            for term in value.split(","):
+                col, _, direction = term.partition(".")
+                direction = direction.split(".")[0] or "asc"
+                if direction not in ("asc", "desc"):
+                    raise QueryError(f"bad order direction: {direction}")
+                terms.append(f"{table.column(col)} {direction.upper()}")
+            order = " ORDER BY " + ", ".join(terms)
+        elif key in ("limit", "offset"):
+            if not value.isdigit():
+                raise QueryError(f"{key} must be an integer")
+            if key == "limit":
+                limit = int(value)
+            else:
+                offset = int(value)
+        elif key in ("or", "and"):
+            where.append(_logical(table, key.upper(), value, params))
+        elif key in RESERVED_PARAMS:
+            raise QueryError(f"unsupported parameter: {key}")
+        else:
+            where.append(_condition(table, key, value, params))
+    return columns, where, params, order, limit, offset
+
+
+class FakePostgrest:
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.tables = {name: Table(self.conn, name) for name in (USERS_TABLE, RELEASES_TABLE)}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def insert(self, table, rows):
+        out = []
+        for row in rows:
+            row = dict(row)
+            if table.name == USERS_TABLE:
+                row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", now_iso())
+            cols = [table.column(c) for c in row]
+            cur = self.conn.execute(
+                f"INSERT INTO {table.name} ({','.join(cols)}) VALUES ({','.join('?' * len(cols))}) RETURNING *",
+                list(row.values()),
+            )
+            out.extend(dict(r) for r in cur.fetchall())
+        return out
+
+    def handle(self, method, path, query, body, prefer):
+        # -> (status, payload or None)
+        name = path.rsplit("/", 1)[-1]
+        table = self.tables.get(name)
+        if table is None or not path.startswith("/rest/v1/"):
+            return 404, {"code": "PGRST205", "message": f"table {name} not found"}
+        representation = "return=representation" in prefer
+        try:
+            with self.lock:
+                self.requests += 1
+                if method == "POST":
+                    data = json.loads(body or b"null")
+                    rows = self.insert(table, data if isinstance(data, list) else [data])
+                    self.conn.commit()
+                    return 201, (rows if representation else None)
+
+                columns, where, params, order, limit, offset = parse_query(table, query)
+                clause = (" WHERE " + " AND ".join(where)) if where else ""
+                if method == "GET":
+                    sql = f"SELECT {columns} FROM {table.name}{clause}{order}"
+                    if limit is not None or offset is not None:
+                        sql += f" LIMIT {-1 if limit is None else limit} OFFSET {offset or 0}"
+                    return 200, [dict(r) for r in self.conn.execute(sql, params)]
+                if method == "PATCH":
+                    changes = json.loads(body or b"{}")
+                    sets = ", ".join(f"{table.column(c)} = ?" for c in changes)
+                    cur = self.conn.execute(
+                        f"UPDATE {table.name} SET {sets}{clause} RETURNING *", list(changes.values()) + params
+                    )
+                elif method == "DELETE":
+                    cur = self.conn.execute(f"DELETE FROM {table.name}{clause} RETURNING *", params)
+                else:
+                    return 405, {"message": f"{method} not supported"}
+                rows = [dict(r) for r in cur.fetchall()]
+                self.conn.commit()
+                return (200, rows) if representation else (204, None)
+        except (QueryError, sqlite3.Error, ValueError) as e:
+            return 400, {"code": "PGRST100", "message": str(e)}
+
+
+# -- PyPI stand-in ------------------------------------------------------------
+
+def pypi_document(name):
+    seed = int(hashlib.blake2b(name.encode("utf-8"), digest_size=4).hexdigest(), 16)
+    major, minor = seed % 5, seed // 5 % 20
+    versions = [f"{major}.{m}.{p}" for m in range(minor + 1) for p in range(3)]
+    latest = versions[-1]
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(days=seed % 600)
+
+    def files(version):
+        return [{
+            "filename": f"{name}-{version}.tar.gz",
+            "packagetype": "sdist",
+            "size": 10000 + seed % 5000,
+            "upload_time_iso_8601": day.isoformat().replace("+00:00", ".000000Z"),
+            "url": f"https://files.example/{name}-{version}.tar.gz",
+            "digests": {"sha256": hashlib.sha256(f"{name}{version}".encode()).hexdigest()},
+        }]
+
+    doc = {
+        "info": {
+            "name": name,
+            "version": latest,
+            "summary": f"Synthetic package {name}",
+            "home_page": f"https://{name}.example",
+            "project_urls": {"Source": f"https://github.com/bench/{name}"},
+            "requires_python": ">=3.8",
+        },
+        "last_serial": seed,
+        "releases": {v: files(v) for v in versions},
+        "urls": files(latest),
+    }
+    return json.dumps(doc).encode("utf-8"), f'"{seed:x}-{latest}"'
+
+
+def _json_handler(route):
+    # route(handler, method, body) -> (status, headers, body bytes)
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            status, headers, payload = route(self, method, body)
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if payload:
+                self.wfile.write(payload)
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_postgrest(db):
+    def route(handler, method, body):
+        parts = urlsplit(handler.path)
+        status, payload = db.handle(method, parts.path, parts.query, body, handler.headers.get("Prefer", ""))
+        if payload is None:
+            return status, {}, b""
+        return status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+    return _serve(_json_handler(route))
+
+
+def start_pypi(latency_ms, stats):
+    documents, lock = {}, threading.Lock()
+
+    def route(handler, method, body):
+        match = re.match(r"^/pypi/([^/]+)/json/?$", handler.path)
+        if method != "GET" or not match:
+            return 404, {}, b""
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000 * random.uniform(0.5, 1.5))
+        name = match.group(1)
+        with lock:
+            stats["requests"] += 1
+            if name not in documents:
+                documents[name] = pypi_document(name)
+            payload, etag = documents[name]
+        if handler.headers.get("If-None-Match") == etag:
+            with lock:
+                stats["not_modified"] += 1
+            return 304, {"ETag": etag}, b""
+        return 200, {"Content-Type": "application/json", "ETag": etag}, payload
+    return _serve(_json_handler(route))
+
+
+# -- Seeding ------------------------------------------------------------------
+
+def package_names(count):
+    return [f"benchpkg-{i:04d}" for i in range(count)]
+
+
+def seed(db, users, releases_per_user, projects, rounds):
+    # -> (admin, [{"email", "id", "release_ids"}, ...])
+    pw_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+    rng = random.Random(42)
+    users_table, releases_table = db.tables[USERS_TABLE], db.tables[RELEASES_TABLE]
+    started = datetime.now(timezone.utc) - timedelta(days=365)
+    with db.lock:
+        admin = db.insert(users_table, [{"name": "Bench Admin", "email": ADMIN_EMAIL, "role": "admin", "password_hash": pw_hash}])[0]
+        seeded = []
+        for i in range(users):
+            user = db.insert(users_table, [{
+                "name": f"Bench User {i}", "email": f"user{i}@bench.local", "role": "user", "password_hash": pw_hash,
+            }])[0]
+            rows = db.insert(releases_table, [{
+                "user_id": user["id"],
+                "project_name": rng.choice(projects),
+                "version": f"{rng.randint(0, 4)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}",
+                "status": rng.choice(STATUSES),
+                "created_at": (started + timedelta(minutes=rng.randint(0, 525600))).isoformat(),
+            } for _ in range(releases_per_user)])
+            seeded.append({"email": user["email"], "id": user["id"], "release_ids": [r["id"] for r in rows]})
+        db.conn.commit()
+    return {"email": ADMIN_EMAIL, "id": admin["id"]}, seeded
+
+
+# -- Clients ------------------------------------------------------------------
+
+def _requirements(rng, packages, count):
+    return "\n".join(
+        f"{name}=={rng.randint(0, 4)}.{rng.randint(0, 20)}.0" for name in rng.sample(packages, count)
+    ).encode("utf-8")
+
+
+def run_op(op, s, base, user, admin_token, rng, cfg):
+    # -> response status
+    if op == "login":
+        r = s.post(f"{base}/login", json={"email": user["email"], "password": PASSWORD})
+    elif op == "me":
+        r = s.get(f"{base}/me")
+    elif op == "releases":
+        r = s.get(f"{base}/releases")
+    elif op == "search":
+        project = rng.choice(cfg["projects"])
+        r = s.get(f"{base}/releases/search", params={"q": project[: rng.randint(3, len(project))]})
+    elif op == "stats":
+        r = s.get(f"{base}/releases/stats")
+    elif op == "create":
+        r = s.post(f"{base}/releases", headers={"Authorization": f"Bearer {admin_token}"}, json={
+            "project_name": rng.choice(cfg["projects"]),
+            "version": f"{rng.randint(5, 9)}.{rng.randint(0, 99)}.{rng.randint(0, 99)}",
+            "user_id": user["id"],
+        })
+    elif op == "update":
+        r = s.patch(f"{base}/releases/{rng.choice(user['release_ids'])}", json={"status": rng.choice(STATUSES)})
+    elif op == "scan":
+        content = _requirements(rng, cfg["packages"], cfg["scan_packages"])
+        r = s.post(
+            f"{base}/scan", params={"stream": "1"},
+            files={"file": ("requirements.txt", content)}, data={"project": f"bench-{user['id'][:8]}"},
+        )
+    elif op == "import":
+        rows = [{"name": name, "latest_version": f"{rng.randint(0, 4)}.{rng.randint(0, 20)}.0"}
+                for name in rng.sample(cfg["packages"], cfg["scan_packages"])]
+        r = s.post(f"{base}/releases/import-scan", json={"rows": rows})
+    else:
+        raise ValueError(op)
+    r.content
+    return r.status_code
+
+
+def _login(s, base, email):
+    r = s.post(f"{base}/login", json={"email": email, "password": PASSWORD}, timeout=60)
+    r.raise_for_status()
+    return r.json()["token"]
+
+
+def client_process(index, cfg, out):
+    # Runs cfg["threads"][index] virtual users; puts {op: [(latency_s, status), ...]}
+    base, mix = cfg["base"], cfg["mix"]
+    ops, weights = list(mix), list(mix.values())
+    records, lock = {}, threading.Lock()
+    warm_until = cfg["start_at"] + cfg["warmup"]
+    stop_at = warm_until + cfg["duration"]
+
+    def virtual_user(slot):
+        rng = random.Random(slot)
+        user = cfg["users"][slot % len(cfg["users"])]
+        s = requests.Session()
+        try:
+            admin_token = _login(s, base, cfg["admin"]["email"])
+            s.headers["Authorization"] = f"Bearer {_login(s, base, user['email'])}"
+        except Exception as e:
+            with lock:
+                records.setdefault("setup", []).append((0.0, type(e).__name__))
+            return
+        local = {}
+        delay = cfg["start_at"] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        while True:
+            op = rng.choices(ops, weights)[0]
+            started = time.time()
+            if started >= stop_at:
+                break
+            try:
+                status = run_op(op, s, base, user, admin_token, rng, cfg)
+            except requests.RequestException as e:
+                status = type(e).__name__
+            if started >= warm_until:
+                local.setdefault(op, []).append((time.time() - started, status))
+        with lock:
+            for op, items in local.items():
+                records.setdefault(op, []).extend(items)
+
+    threads = [threading.Thread(target=virtual_user, args=(slot,)) for slot in cfg["slots"][index]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put(records)
+
+
+# -- Report -------------------------------------------------------------------
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    rank = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def summarize(records, duration):
+    summary = {}
+    everything = []
+    for op in sorted(records):
+        items = records[op]
+        latencies = sorted(lat for lat, _ in items)
+        errors = sum(1 for _, status in items if not (isinstance(status, int) and status < 400))
+        statuses = {}
+        for _, status in items:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        summary[op] = _stats(latencies, errors, duration, statuses)
+        everything.extend(latencies)
+    summary["total"] = _stats(sorted(everything), sum(s["errors"] for s in summary.values()), duration, None)
+    return summary
+
+
+def _stats(latencies, errors, duration, statuses):
+    stats = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration if duration else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+    if statuses is not None:
+        stats["statuses"] = statuses
+    return stats
+
+
+def print_report(summary, baseline=None):
+    header = f"{'op':<10}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    if baseline:
+        header += f"{'req/s vs base':>15}{'p99 vs base':>13}"
+    print(header)
+    for op, s in summary.items():
+        line = (f"{op:<10}{s['requests']:>9}{s['errors']:>8}{s['rps']:>9.1f}"
+                f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+        base = (baseline or {}).get(op)
+        if base and base["rps"] and base["p99_ms"]:
+            line += f"{s['rps'] / base['rps'] - 1:>+15.1%}{s['p99_ms'] / base['p99_ms'] - 1:>+13.1%}"
+        print(line)
+    failing = {op: s["statuses"] for op, s in summary.items()
+               if s.get("errors") and "statuses" in s}
+    for op, statuses in failing.items():
+        print(f"  {op} statuses: {statuses}")
+
+
+# -- Main ---------------------------------------------------------------------
+
+def parse_mix(value):
+    if value in MIXES:
+        return dict(MIXES[value])
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        op = op.strip()
+        if op not in MIXES["mixed"]:
+            raise argparse.ArgumentTypeError(f"unknown operation: {op}")
+        try:
+            mix[op] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight of {op} must be a number")
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args, env, log_path):
+    port = free_port()
+    cmd = [
+        sys.executable, "-m", "gunicorn", "wsgi:app",
+        "-w", str(args.workers), "-k", "gthread", "--threads", str(args.threads),
+        "-b", f"127.0.0.1:{port}", "--backlog", "512",
+    ]
+    log = open(log_path, "w")
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            if requests.get(f"{base}/me", timeout=1).status_code == 401:
+                return proc, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"gunicorn did not come up; see {log_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", type=parse_mix, default="mixed", help=f"one of {', '.join(MIXES)} or op=weight,...")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unrecorded seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users (closed loop)")
+    parser.add_argument("--client-procs", type=int, default=0, help="client processes (default: one per 8 users)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--releases-per-user", type=int, default=20)
+    parser.add_argument("--package-pool", type=int, default=500, help="distinct PyPI package names")
+    parser.add_argument("--scan-packages", type=int, default=25, help="packages per scan / import")
+    parser.add_argument("--pypi-latency-ms", type=float, default=80)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server environment")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with results saved by --save")
+    parser.add_argument("--keep-logs", action="store_true", help="keep the temp dir with the gunicorn log")
+    args = parser.parse_args()
+    mix = args.mix if isinstance(args.mix, dict) else parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    db, pypi_stats = FakePostgrest(), {"requests": 0, "not_modified": 0}
+    packages = package_names(args.package_pool)
+    projects = packages[: max(20, args.package_pool // 5)]
+    admin, users = seed(db, args.users, args.releases_per_user, projects, args.bcrypt_rounds)
+    _, rest_url = start_postgrest(db)
+    _, pypi_url = start_pypi(args.pypi_latency_ms, pypi_stats)
+
+    env = dict(os.environ)
+    env.update({
+        "SUPABASE_URL": rest_url,
+        "SUPABASE_SERVICE_ROLE_KEY": "bench",
+        "JWT_SECRET": "bench-secret-" + uuid.uuid4().hex,
+        "USERS_TABLE": USERS_TABLE,
+        "RELEASES_TABLE": RELEASES_TABLE,
+        "USER_PASSWORD_COL": "password_hash",
+        "PYPI_BASE_URL": pypi_url,
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "LOCAL_STORE_PATH": os.path.join(workdir, "store.sqlite3"),
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    server, base = start_gunicorn(args, env, os.path.join(workdir, "gunicorn.log"))
+    try:
+        procs_count = args.client_procs or max(1, (args.concurrency + 7) // 8)
+        slots = [list(range(i, args.concurrency, procs_count)) for i in range(procs_count)]
+        cfg = {
+            "base": base, "mix": mix, "users": users, "admin": admin, "packages": packages, "projects": projects,
+            "scan_packages": min(args.scan_packages, len(packages)), "slots": slots,
+            "warmup": args.warmup, "duration": args.duration,
+            # Leave time for every virtual user to log in before the clock starts
+            "start_at": time.time() + 2 + args.concurrency * 0.05,
+        }
+        print(f"{args.concurrency} users in {procs_count} client procs -> {args.workers}x{args.threads} gthread, "
+              f"mix {mix}, {args.warmup:g}s warmup + {args.duration:g}s", flush=True)
+        out = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client_process, args=(i, cfg, out)) for i in range(procs_count)]
+        for p in procs:
+            p.start()
+        records = {}
+        for _ in procs:
+            for op, items in out.get().items():
+                records.setdefault(op, []).extend(items)
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    setup_failures = records.pop("setup", [])
+    if setup_failures:
+        print(f"{len(setup_failures)} virtual users failed to log in: {sorted({s for _, s in setup_failures})}")
+    summary = summarize(records, args.duration)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["summary"]
+    print_report(summary, baseline)
+    print(f"stand-ins: {db.requests} PostgREST requests, {pypi_stats['requests']} PyPI requests "
+          f"({pypi_stats['not_modified']} answered 304)")
+
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("save", "baseline")},
+                       "mix": mix, "summary": summary}, fh, indent=2)
+    if args.keep_logs:
+        print(f"logs kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
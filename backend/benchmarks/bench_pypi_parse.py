@@ -0,0 +1,129 @@
+"""Compare PyPI project-document handling: full json.loads vs streaming extraction.
+
+Usage (from backend/):
+    python benchmarks/bench_pypi_parse.py --record      # download fixtures once
+    python benchmarks/bench_pypi_parse.py               # run the comparison
+
+Each (fixture, mode) pair runs in a fresh interpreter so peak RSS is not
+polluted by earlier runs. "full" mirrors the previous code path (whole body
+in memory, decoded to text, json.loads, pick info/releases); "stream" feeds
+64 KiB chunks to services.pypi_stream.extract_top_level.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_PACKAGES = ["boto3", "botocore", "google-cloud-aiplatform", "requests"]
+CHUNK_BYTES = 64 * 1024
+
+
+def record(packages):
+    import requests
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name in packages:
+        resp = requests.get(f"https://pypi.org/pypi/{name}/json", timeout=30)
+        resp.raise_for_status()
+        path = os.path.join(FIXTURES_DIR, f"{name}.json")
+        with open(path, "wb") as fh:
+            fh.write(resp.content)
+        print(f"recorded {path} ({len(resp.content)} bytes)")
+
+
+def _run_full(path):
+    with open(path, "rb") as fh:
+        body = fh.read()
+    j = json.loads(body.decode("utf-8"))
+    info = j.get("info", {})
+    files = j.get("releases", {}).get(info.get("version")) or []
+    return info.get("version"), files[0].get("upload_time_iso_8601") if files else None
+
+
+def _run_stream(path):
+    from services.pypi_stream import extract_top_level
+
+    def chunks():
+        with open(path, "rb") as fh:
+            while True:
+                chunk = fh.read(CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+
+    j = extract_top_level(chunks(), ("info", "urls"))
+    files = j.get("urls") or []
+    return j["info"].get("version"), files[0].get("upload_time_iso_8601") if files else None
+
+
+def worker(mode, path, repeat):
+    sys.path.insert(0, BACKEND_DIR)
+    fn = _run_full if mode == "full" else _run_stream
+    if mode == "stream":
+        import services.pypi_stream  # noqa: F401  (keep import cost out of the measurement)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    result = fn(path)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(path)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    print(json.dumps({
+        "result": result,
+        "traced_peak_kib": traced_peak // 1024,
+        "rss_growth_kib": rss_after - rss_before,  # ru_maxrss is KiB on Linux
+        "median_ms": statistics.median(timings),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="download fixtures from pypi.org")
+    parser.add_argument("--packages", nargs="*", default=DEFAULT_PACKAGES)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], args.worker[1], args.repeat)
+        return
+    if args.record:
+        record(args.packages)
+        return
+
+    print(f"{'fixture':<28}{'size KiB':>10}  {'mode':<7}{'parse ms':>10}{'traced KiB':>12}{'RSS +KiB':>10}")
+    for name in args.packages:
+        path = os.path.join(FIXTURES_DIR, f"{name}.json")
+        if not os.path.exists(path):
+            print(f"{name:<28}missing fixture (run with --record)")
+            continue
+        size = os.path.getsize(path) // 1024
+        results = {}
+        for mode in ("full", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", mode, path, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(out)
+            r = results[mode]
+            print(f"{name:<28}{size:>10}  {mode:<7}{r['median_ms']:>10.1f}{r['traced_peak_kib']:>12}{r['rss_growth_kib']:>10}")
+        if results["full"]["result"] != results["stream"]["result"]:
+            print(f"  !! results differ: {results['full']['result']} vs {results['stream']['result']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 import json
+import time
 import logging
-import bcrypt
 import requests
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 
-from ..utils.supabase import REST_BASE, USERS_TABLE, USER_PASSWORD_COL, HEADERS, ADMIN_SIGNUP_SECRET
+from ..utils.supabase import USERS_TABLE, USER_PASSWORD_COL, ADMIN_SIGNUP_SECRET
+from ..utils import supabase_client as sb
+from ..utils import conditional, fastjson, passwords, identity_cache, revocation
+from ..services import release_stats, release_search
 from ..utils.auth import create_jwt, get_user_from_request, require_roles
+from ..utils.pagination import parse_page_args, page_query, finish_page, next_link, date_range_filters, prefix_filter, quote_eq
 
 bp_auth = Blueprint("auth", __name__)
 
+# Columns /admin/users may project; the password hash is never selectable
+USER_FIELDS = ("id", "name", "email", "role", "created_at")
+
 @bp_auth.route("/register", methods=["POST"])
 def register():
     data = request.get_json() or {}
@@ -23,8 +30,8 @@ def register():
     if len(password) < 8:
         return jsonify({"error": "password must be at least 8 characters"}), 400
 
-    q = f"{REST_BASE}/{USERS_TABLE}?email=eq.{requests.utils.requote_uri(email)}&select=id"
-    r = requests.get(q, headers=HEADERS, timeout=8)
+    q = f"{USERS_TABLE}?email=eq.{requests.utils.requote_uri(email)}&select=id"
+    r = sb.get(q)
     if r.status_code != 200:
         logging.error("Supabase users lookup failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to check existing users"}), 502
@@ -35,14 +42,14 @@ def register():
         return jsonify({"error": "admin signup is disabled"}), 403
     role_value = "user"
 
-    pw_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    pw_hash = passwords.hash_password(password)
     payload = {"name": name, "email": email, USER_PASSWORD_COL: pw_hash, "role": role_value}
 
-    insert_url = f"{REST_BASE}/{USERS_TABLE}"
-    r2 = requests.post(insert_url, headers={**HEADERS, "Prefer": "return=representation"}, data=json.dumps(payload), timeout=8)
+    r2 = sb.post(USERS_TABLE, headers={"Prefer": "return=representation"}, data=json.dumps(payload))
     if r2.status_code not in (200, 201):
         logging.error("Supabase user insert failed: %s %s", r2.status_code, r2.text)
         return jsonify({"error": "failed to create user"}), 502
+    conditional.bump("users")
 
     user_row = r2.json()[0]
     user_id = user_row.get("id")
@@ -52,6 +59,13 @@ def register():
 
 @bp_auth.route("/login", methods=["POST"])
 def login():
+    started = time.perf_counter()
+    try:
+        return _login()
+    finally:
+        passwords.observe_login(time.perf_counter() - started)
+
+def _login():
     data = request.get_json() or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
@@ -60,8 +74,8 @@ def login():
     if not email or not password:
         return jsonify({"error": "email and password are required"}), 400
 
-    q = f"{REST_BASE}/{USERS_TABLE}?email=eq.{requests.utils.requote_uri(email)}&select=id,name,email,role,{USER_PASSWORD_COL}"
-    r = requests.get(q, headers=HEADERS, timeout=8)
+    q = f"{USERS_TABLE}?email=eq.{requests.utils.requote_uri(email)}&select=id,name,email,role,{USER_PASSWORD_COL}"
+    r = sb.get(q)
     if r.status_code != 200:
         logging.error("Supabase users fetch failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to fetch user"}), 502
@@ -75,13 +89,18 @@ def login():
     if not stored_hash:
         return jsonify({"error": "invalid email or password"}), 401
 
-    try:
-        matches = bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
-    except Exception:
+    if not passwords.verify_password(password, stored_hash):
         return jsonify({"error": "invalid email or password"}), 401
 
-    if not matches:
-        return jsonify({"error": "invalid email or password"}), 401
+    # Hashes made with an older BCRYPT_ROUNDS are upgraded in the background
+    if passwords.needs_rehash(stored_hash):
+        user_url = f"{USERS_TABLE}?id=eq.{requests.utils.requote_uri(str(user.get('id')))}"
+
+        def save(new_hash):
+            r = sb.patch(user_url, data=json.dumps({USER_PASSWORD_COL: new_hash}))
+            if r.status_code not in (200, 204):
+                raise RuntimeError(f"{r.status_code} {r.text}")
+        passwords.rehash_later(password, save)
 
     # If client asks to login as a specific role, enforce it
     actual_role = user.get("role")
@@ -91,20 +110,41 @@ def login():
     token = create_jwt({"user_id": user.get("id"), "email": user.get("email"), "role": actual_role})
     return jsonify({"user": {"id": user.get("id"), "name": user.get("name"), "email": user.get("email"), "role": actual_role}, "token": token}), 200
 
+@bp_auth.route("/logout", methods=["POST"])
+def logout():
+    _, error_response = get_user_from_request()
+    if error_response:
+        return error_response
+    # False for legacy tokens without a jti, which simply run to their exp
+    revoked = revocation.revoke_token(g.jwt_claims)
+    return jsonify({"logged_out": True, "revoked": revoked}), 200
+
 @bp_auth.route("/me", methods=["GET"])
 def me():
     user_id, error_response = get_user_from_request()
     if error_response:
         return error_response
 
-    q = f"{REST_BASE}/{USERS_TABLE}?id=eq.{user_id}&select=id,name,email,role,created_at"
-    r = requests.get(q, headers=HEADERS, timeout=8)
-    if r.status_code != 200 or not r.json():
-        logging.error("Supabase /me fetch failed: %s %s", r.status_code, r.text)
-        return jsonify({"error": "failed to fetch user"}), 502
+    gen = conditional.stamp([f"users:{user_id}"])
+    etag = conditional.etag_from(gen, user_id)
+    cached = conditional.not_modified(etag)
+    if cached:
+        return cached
 
-    user = r.json()[0]
-    return jsonify({"user": user}), 200
+    user = identity_cache.get_profile(user_id, gen)
+    if user is None:
+        q = f"{USERS_TABLE}?id=eq.{user_id}&select=id,name,email,role,created_at"
+        r = sb.get(q)
+        if r.status_code != 200 or not r.json():
+            logging.error("Supabase /me fetch failed: %s %s", r.status_code, r.text)
+            return jsonify({"error": "failed to fetch user"}), 502
+        user = r.json()[0]
+        identity_cache.put_profile(user_id, gen, user, not_after=g.jwt_claims.get("exp"))
+
+    resp = jsonify({"user": user})
+    if etag:
+        resp.set_etag(etag)
+    return resp, 200
 
 
 # Admin endpoints
@@ -114,12 +154,42 @@ def admin_list_users():
     if error_response:
         return error_response
 
-    q = f"{REST_BASE}/{USERS_TABLE}?select=id,name,email,role,created_at&order=created_at.desc"
-    r = requests.get(q, headers=HEADERS, timeout=8)
+    page, error_response = parse_page_args(USER_FIELDS)
+    if error_response:
+        return error_response
+    filters, error_response = date_range_filters()
+    if error_response:
+        return error_response
+    role = (request.args.get("role") or "").strip()
+    if role:
+        filters.append(f"role=eq.{quote_eq(role)}")
+    email = (request.args.get("email") or "").strip()
+    if email:
+        filters.append(prefix_filter("email", email))
+
+    etag = conditional.etag_for(["users"])
+    cached = conditional.not_modified(etag)
+    if cached:
+        return cached
+
+    q = f"{USERS_TABLE}?" + "&".join(filters + [page_query(page)])
+    r = sb.get(q, stream=page["all"])
     if r.status_code != 200:
         logging.error("Supabase list users failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to fetch users"}), 502
-    return jsonify({"users": r.json()}), 200
+    if page["all"]:
+        # Wrap the untouched PostgREST array instead of decoding and re-encoding it
+        resp = sb.passthrough(r, prefix=b'{"next_cursor":null,"users":', suffix=b"}\n")
+        if etag:
+            resp.set_etag(etag)
+        return resp, 200
+    users, next_cursor = finish_page(fastjson.loads(r.content), page)
+    resp = jsonify({"users": users, "next_cursor": next_cursor})
+    if next_cursor:
+        resp.headers["Link"] = next_link(next_cursor)
+    if etag:
+        resp.set_etag(etag)
+    return resp, 200
 
 
 @bp_auth.route("/admin/users/<user_id>", methods=["DELETE"])
@@ -128,11 +198,17 @@ def admin_delete_user(user_id: str):
     if error_response:
         return error_response
 
-    url = f"{REST_BASE}/{USERS_TABLE}?id=eq.{requests.utils.requote_uri(user_id)}"
-    r = requests.delete(url, headers=HEADERS, timeout=8)
+    url = f"{USERS_TABLE}?id=eq.{requests.utils.requote_uri(user_id)}"
+    r = sb.delete(url)
     if r.status_code not in (200, 204):
         logging.error("Supabase delete user failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to delete user"}), 502
+    # Their releases may be removed by cascade, so release listings are invalidated too
+    conditional.bump("users", f"users:{user_id}", "releases", f"releases:{user_id}")
+    identity_cache.invalidate_user(user_id)
+    revocation.revoke_user(user_id)
+    release_stats.request_reconcile()
+    release_search.forget_user(user_id)
     return jsonify({"deleted": True, "id": user_id}), 200
 
 
@@ -149,12 +225,16 @@ def admin_set_user_role(user_id: str):
     if new_role == "admin":
         return jsonify({"error": "promoting to admin is disabled"}), 403
 
-    url = f"{REST_BASE}/{USERS_TABLE}?id=eq.{requests.utils.requote_uri(user_id)}"
+    url = f"{USERS_TABLE}?id=eq.{requests.utils.requote_uri(user_id)}"
     payload = json.dumps({"role": new_role})
-    r = requests.patch(url, headers={**HEADERS, "Prefer": "return=representation"}, data=payload, timeout=8)
+    r = sb.patch(url, headers={"Prefer": "return=representation"}, data=payload)
     if r.status_code not in (200, 204):
         logging.error("Supabase update user role failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to update role"}), 502
+    conditional.bump("users", f"users:{user_id}")
+    identity_cache.invalidate_user(user_id)
+    # Existing tokens carry the old role claim; the user signs in again for the new one
+    revocation.revoke_user(user_id)
 
     rows = r.json() if r.text else []
     updated = rows[0] if rows else {"id": user_id, "role": new_role}
@@ -0,0 +1,75 @@
+import os
+import hmac
+from flask import Blueprint, jsonify, request, Response
+
+from ..utils.auth import require_roles
+from ..utils import supabase_client, passwords, identity_cache, revocation, metrics, profiler
+from ..services import pypi_cache, pypi_enrich, releases_cache, release_search
+
+bp_diagnostics = Blueprint("diagnostics", __name__)
+
+# Scrapers usually cannot log in, so /metrics also takes a static bearer token.
+# Without the token it needs an admin JWT, unless METRICS_PUBLIC opts out (e.g.
+# the port is only reachable from the scraper's network).
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.environ.get("METRICS_PUBLIC", "").lower() in ("1", "true", "yes")
+
+# Counters are per gunicorn worker; "pid" tells which worker answered
+@bp_diagnostics.route("/admin/diagnostics", methods=["GET"])
+def diagnostics():
+    _, _, error_response = require_roles(["admin"])
+    if error_response:
+        return error_response
+
+    return jsonify({
+        "pid": os.getpid(),
+        "pypi_cache": pypi_cache.stats(),
+        "pypi_singleflight": pypi_enrich.singleflight_stats(),
+        "releases_cache": releases_cache.stats(),
+        "release_search": release_search.stats(),
+        "supabase": supabase_client.stats(),
+        "passwords": passwords.stats(),
+        "identity_cache": identity_cache.stats(),
+        "revocation": revocation.stats(),
+    }), 200
+
+
+@bp_diagnostics.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    scraper = METRICS_TOKEN and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}")
+    if not scraper and not METRICS_PUBLIC:
+        _, _, error_response = require_roles(["admin"])
+        if error_response:
+            return error_response
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"), 200
+
+
+# Samples only the worker that serves this request (named in X-Profile-Pid);
+# there is no way to pick a worker, so other workers are not covered
+@bp_diagnostics.route("/admin/profile", methods=["GET"])
+def sample_profile():
+    _, _, error_response = require_roles(["admin"])
+    if error_response:
+        return error_response
+
+    try:
+        seconds = float(request.args.get("seconds", profiler.PROFILE_DEFAULT_SECONDS))
+        interval_ms = float(request.args.get("interval_ms", profiler.PROFILE_INTERVAL_MS))
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    if not 0 < seconds <= profiler.PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be in (0, {profiler.PROFILE_MAX_SECONDS:g}]"}), 400
+    if not interval_ms > 0:
+        return jsonify({"error": "interval_ms must be positive"}), 400
+    route = request.args.get("route") or None
+    all_threads = request.args.get("threads") == "all"
+
+    try:
+        text, meta = profiler.profile(seconds, interval_ms, route=route, all_threads=all_threads)
+    except profiler.ProfilerBusy:
+        return jsonify({"error": "a profile is already running in this worker", "pid": os.getpid()}), 409
+
+    response = Response(text, content_type="text/plain; charset=utf-8")
+    for key, value in meta.items():
+        response.headers[f"X-Profile-{key.replace('_', '-').title()}"] = str(value)
+    return response, 200
@@ -1,31 +1,170 @@
 import json
 import logging
-import requests
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 
-from ..utils.supabase import REST_BASE, RELEASES_TABLE, HEADERS
+from ..utils.supabase import RELEASES_TABLE
+from ..utils import supabase_client as sb
+from ..utils import conditional, fastjson
+from ..services import releases_cache, release_stats, release_search
 from ..utils.auth import get_user_from_request, get_identity_from_request, require_roles
 from ..utils.supabase import now_iso
+from ..utils.pagination import parse_page_args, page_query, finish_page, next_link, date_range_filters, prefix_filter, quote_eq
 
 bp_releases = Blueprint("releases", __name__)
 
+# Pairs per existence lookup (bounded by URL length) and rows per batched insert
+IMPORT_LOOKUP_CHUNK = 50
+IMPORT_INSERT_CHUNK = 200
+
+RELEASE_FIELDS = ("id", "user_id", "project_name", "version", "status", "created_at")
+
+# /releases/search result cap
+SEARCH_LIMIT_DEFAULT = 20
+SEARCH_LIMIT_MAX = 100
+
+# Ids per id=in.(...) call and per batch request
+BATCH_CHUNK = 100
+BATCH_MAX_IDS = 1000
+
+def _releases_changed(*owner_ids, created=(), updated=(), deleted=()) -> None:
+    # Every write path ends here with the rows PostgREST returned: updates the
+    # stats aggregates and search index, and invalidates the admin-wide and
+    # per-owner listings
+    release_stats.apply(created=created, updated=updated, deleted=deleted)
+    release_search.record(created=created, updated=updated, deleted=deleted)
+    conditional.bump("releases", *(f"releases:{uid}" for uid in owner_ids if uid))
+
+
+def _fetch_releases(q: str) -> list:
+    r = sb.get(q)
+    if r.status_code != 200:
+        raise RuntimeError(f"{r.status_code} {r.text}")
+    return fastjson.loads(r.content)
+
+
 @bp_releases.route("/releases", methods=["GET"])
 def get_releases():
     user_id, role, error_response = get_identity_from_request()
     if error_response:
         return error_response
 
-    if role == "admin":
-        q = f"{REST_BASE}/{RELEASES_TABLE}?select=*&order=created_at.desc"
-    else:
-        q = f"{REST_BASE}/{RELEASES_TABLE}?user_id=eq.{user_id}&select=*&order=created_at.desc"
-    r = requests.get(q, headers=HEADERS, timeout=8)
-    if r.status_code != 200:
-        logging.error("Supabase releases fetch failed: %s %s", r.status_code, r.text)
+    page, error_response = parse_page_args(RELEASE_FIELDS)
+    if error_response:
+        return error_response
+    filters, error_response = date_range_filters()
+    if error_response:
+        return error_response
+
+    # Non-admins are always scoped to their own releases; admins may filter by user
+    scope_user = request.args.get("user_id", "").strip() if role == "admin" else str(user_id)
+    if scope_user:
+        filters.append(f"user_id=eq.{quote_eq(scope_user)}")
+    status = (request.args.get("status") or "").strip()
+    if status:
+        filters.append(f"status=eq.{quote_eq(status)}")
+    project = (request.args.get("project") or "").strip()
+    if project:
+        filters.append(prefix_filter("project_name", project))
+
+    scope = "releases" if role == "admin" else f"releases:{user_id}"
+    gen = conditional.stamp([scope])
+    etag = conditional.etag_from(gen, role, user_id)
+    cached = conditional.not_modified(etag)
+    if cached:
+        return cached
+
+    q = f"{RELEASES_TABLE}?" + "&".join(filters + [page_query(page)])
+    if page["all"]:
+        # Full listings need no rewriting: stream the PostgREST body through untouched
+        # instead of decoding and re-encoding (and caching) every row
+        try:
+            r = sb.get(q, stream=True)
+        except sb.SupabaseUnavailable:
+            raise
+        except Exception as e:
+            logging.error("Supabase releases fetch failed: %s", str(e))
+            return jsonify({"error": "failed to fetch releases"}), 502
+        if r.status_code != 200:
+            logging.error("Supabase releases fetch failed: %s %s", r.status_code, r.text)
+            return jsonify({"error": "failed to fetch releases"}), 502
+        resp = sb.passthrough(r)
+        resp.headers["X-Releases-Cache"] = "BYPASS"
+        if etag:
+            resp.set_etag(etag)
+        return resp, 200
+
+    try:
+        rows, cache_state = releases_cache.get((scope, q), gen, lambda: _fetch_releases(q))
+    except sb.SupabaseUnavailable:
+        raise
+    except Exception as e:
+        logging.error("Supabase releases fetch failed: %s", str(e))
         return jsonify({"error": "failed to fetch releases"}), 502
 
-    return jsonify(r.json()), 200
+    # Body stays a plain array for existing clients; the next page is advertised in headers
+    rows, next_cursor = finish_page(rows, page)
+    resp = jsonify(rows)
+    resp.headers["X-Releases-Cache"] = cache_state
+    if next_cursor:
+        resp.headers["Link"] = next_link(next_cursor)
+        resp.headers["X-Next-Cursor"] = next_cursor
+    # A fallback copy predates the current generation, so it must not carry its ETag
+    if etag and cache_state != "FALLBACK":
+        resp.set_etag(etag)
+    return resp, 200
+
+@bp_releases.route("/releases/stats", methods=["GET"])
+def get_release_stats():
+    user_id, role, error_response = get_identity_from_request()
+    if error_response:
+        return error_response
+
+    # Admins see everyone (or one user via ?user_id=); users only themselves
+    scope = ((request.args.get("user_id") or "").strip() or "*") if role == "admin" else str(user_id)
+    try:
+        stats = release_stats.snapshot(scope)
+        if stats["reconciled_at"] is None:
+            # First use on this host: build the aggregates once before answering
+            release_stats.reconcile()
+            stats = release_stats.snapshot(scope)
+    except sb.SupabaseUnavailable:
+        raise
+    except Exception as e:
+        logging.error("Release stats failed: %s", str(e))
+        return jsonify({"error": "failed to compute release stats"}), 502
+    return jsonify({"scope": "all" if scope == "*" else scope, **stats}), 200
+
+@bp_releases.route("/releases/search", methods=["GET"])
+def search_releases():
+    user_id, role, error_response = get_identity_from_request()
+    if error_response:
+        return error_response
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", SEARCH_LIMIT_DEFAULT)), 1), SEARCH_LIMIT_MAX)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    # Same scoping as the listing: admins see everyone (or ?user_id=), users themselves
+    scope_user = ((request.args.get("user_id") or "").strip() or None) if role == "admin" else str(user_id)
+    try:
+        results = release_search.search(
+            q,
+            user_id=scope_user,
+            status=(request.args.get("status") or "").strip() or None,
+            version=(request.args.get("version") or "").strip() or None,
+            limit=limit,
+        )
+    except (sb.SupabaseUnavailable, release_search.SearchIndexNotReady):
+        raise
+    except Exception as e:
+        logging.error("Release search failed: %s", str(e))
+        return jsonify({"error": "failed to search releases"}), 502
+    return jsonify({"query": q, "results": results}), 200
 
 @bp_releases.route("/releases", methods=["POST"])
 def create_release():
@@ -49,12 +188,12 @@ def create_release():
         "status": status,
         "created_at": now_iso(),
     }
-    insert_url = f"{REST_BASE}/{RELEASES_TABLE}"
-    r = requests.post(insert_url, headers={**HEADERS, "Prefer": "return=representation"}, data=json.dumps(payload), timeout=8)
+    r = sb.post(RELEASES_TABLE, headers={"Prefer": "return=representation"}, data=json.dumps(payload))
     if r.status_code not in (200, 201):
         logging.error("Supabase release insert failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to create release"}), 502
 
+    _releases_changed(target_user_id, created=r.json())
     return jsonify(r.json()[0]), 201
 
 @bp_releases.route("/releases/<int:release_id>", methods=["PATCH"])
@@ -69,14 +208,16 @@ def update_release_status(release_id):
         return jsonify({"error": "status is required"}), 400
 
     if role == "admin":
-        url = f"{REST_BASE}/{RELEASES_TABLE}?id=eq.{release_id}"
+        url = f"{RELEASES_TABLE}?id=eq.{release_id}"
     else:
-        url = f"{REST_BASE}/{RELEASES_TABLE}?id=eq.{release_id}&user_id=eq.{user_id}"
-    r = requests.patch(url, headers={**HEADERS, "Prefer": "return=representation"}, data=json.dumps({"status": new_status}), timeout=8)
+        url = f"{RELEASES_TABLE}?id=eq.{release_id}&user_id=eq.{user_id}"
+    r = sb.patch(url, headers={"Prefer": "return=representation"}, data=json.dumps({"status": new_status}))
     if r.status_code not in (200, 204):
         logging.error("Supabase release update failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to update release"}), 502
 
+    rows = r.json() if r.text else []
+    _releases_changed(*([row.get("user_id") for row in rows] or [user_id]), updated=rows)
     try:
         updated = r.json()[0]
         return jsonify(updated), 200
@@ -89,14 +230,99 @@ def delete_release(release_id):
     if error_response:
         return error_response
 
-    url = f"{REST_BASE}/{RELEASES_TABLE}?id=eq.{release_id}&user_id=eq.{user_id}"
-    r = requests.delete(url, headers=HEADERS, timeout=8)
+    url = f"{RELEASES_TABLE}?id=eq.{release_id}&user_id=eq.{user_id}"
+    r = sb.delete(url, headers={"Prefer": "return=representation"})
     if r.status_code not in (200, 204):
         logging.error("Supabase release delete failed: %s %s", r.status_code, r.text)
         return jsonify({"error": "failed to delete release"}), 502
 
+    _releases_changed(user_id, deleted=r.json() if r.text else [])
     return ("", 204)
 
+def _batch_ids(data):
+    # -> (ids, error_response); ids are de-duplicated, order kept
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids:
+        return None, (jsonify({"error": "ids[] required"}), 400)
+    if len(ids) > BATCH_MAX_IDS:
+        return None, (jsonify({"error": f"at most {BATCH_MAX_IDS} ids per request"}), 400)
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return None, (jsonify({"error": "ids must be integers"}), 400)
+    return list(dict.fromkeys(ids)), None
+
+
+def _run_batch(ids, send, done_outcome):
+    # send(filter) issues one PostgREST call for a chunk and returns the response.
+    # Ids missing from the returned rows do not exist or are out of the caller's scope.
+    results, touched, failed = {}, [], 0
+    for i in range(0, len(ids), BATCH_CHUNK):
+        chunk = ids[i:i + BATCH_CHUNK]
+        r = send(f"id=in.({','.join(map(str, chunk))})")
+        if r.status_code not in (200, 204):
+            logging.error("Supabase batch %s failed: %s %s", done_outcome, r.status_code, r.text)
+            failed += 1
+            for rid in chunk:
+                results[rid] = {"id": rid, "outcome": "error"}
+            continue
+        by_id = {row.get("id"): row for row in (r.json() if r.text else [])}
+        touched.extend(by_id.values())
+        for rid in chunk:
+            row = by_id.get(rid)
+            results[rid] = {"id": rid, "outcome": done_outcome, "release": row} if row else {"id": rid, "outcome": "not_found"}
+    return [results[rid] for rid in ids], touched, failed
+
+
+@bp_releases.route("/releases/batch/status", methods=["POST"])
+def batch_update_status():
+    user_id, role, error_response = get_identity_from_request()
+    if error_response:
+        return error_response
+
+    data = request.get_json(silent=True) or {}
+    ids, error_response = _batch_ids(data)
+    if error_response:
+        return error_response
+    new_status = (data.get("status") or "").strip()
+    if not new_status:
+        return jsonify({"error": "status is required"}), 400
+
+    # Same scoping as PATCH /releases/<id>: admins may update any release
+    scope = "" if role == "admin" else f"&user_id=eq.{user_id}"
+    body = json.dumps({"status": new_status})
+    results, touched, failed = _run_batch(
+        ids,
+        lambda flt: sb.patch(f"{RELEASES_TABLE}?{flt}{scope}", headers={"Prefer": "return=representation"}, data=body),
+        "updated",
+    )
+    if touched:
+        _releases_changed(*{row.get("user_id") for row in touched}, updated=touched)
+    if failed and not touched:
+        return jsonify({"error": "failed to update releases"}), 502
+    return jsonify({"results": results, "updated": len(touched)}), 200
+
+
+@bp_releases.route("/releases/batch/delete", methods=["POST"])
+def batch_delete():
+    user_id, role, error_response = get_identity_from_request()
+    if error_response:
+        return error_response
+
+    ids, error_response = _batch_ids(request.get_json(silent=True) or {})
+    if error_response:
+        return error_response
+
+    # Same scoping as DELETE /releases/<id>: only the caller's own releases
+    results, touched, failed = _run_batch(
+        ids,
+        lambda flt: sb.delete(f"{RELEASES_TABLE}?{flt}&user_id=eq.{user_id}", headers={"Prefer": "return=representation"}),
+        "deleted",
+    )
+    if touched:
+        _releases_changed(user_id, deleted=touched)
+    if failed and not touched:
+        return jsonify({"error": "failed to delete releases"}), 502
+    return jsonify({"results": results, "deleted": len(touched)}), 200
+
 @bp_releases.route("/releases/import-scan", methods=["POST"])
 def import_scan():
     user_id, role, error_response = get_identity_from_request()
@@ -109,46 +335,53 @@ def import_scan():
     if not isinstance(rows, list) or not rows:
         return jsonify({"error": "rows[] required"}), 400
 
-    created_or_existing = []
+    pairs = []
     for rrow in rows:
         project_name = (rrow.get("name") or "").strip()
         version = (rrow.get("latest_version") or "").strip() or "unknown"
-        if not project_name:
-            continue
-        if role == "admin":
-            check_q = (
-                f"{REST_BASE}/{RELEASES_TABLE}?project_name=eq.{requests.utils.requote_uri(project_name)}"
-                f"&version=eq.{requests.utils.requote_uri(version)}&select=*"
-            )
-        else:
-            check_q = (
-                f"{REST_BASE}/{RELEASES_TABLE}?user_id=eq.{user_id}"
-                f"&project_name=eq.{requests.utils.requote_uri(project_name)}"
-                f"&version=eq.{requests.utils.requote_uri(version)}&select=*"
-            )
-        cr = requests.get(check_q, headers=HEADERS, timeout=8)
+        if project_name:
+            pairs.append((project_name, version))
+    unique_pairs = list(dict.fromkeys(pairs))
+
+    # One filtered lookup per chunk instead of a GET per row
+    scope = "" if role == "admin" else f"user_id=eq.{user_id}&"
+    existing = {}
+    for i in range(0, len(unique_pairs), IMPORT_LOOKUP_CHUNK):
+        chunk = unique_pairs[i:i + IMPORT_LOOKUP_CHUNK]
+        cond = ",".join(
+            f"and(project_name.eq.{sb.quote_value(p)},version.eq.{sb.quote_value(v)})" for p, v in chunk
+        )
+        cr = sb.get(f"{RELEASES_TABLE}?{scope}or=({cond})&select=*")
         if cr.status_code != 200:
             logging.warning("Supabase check existing failed: %s %s", cr.status_code, cr.text)
             return jsonify({"error": "failed to check existing releases"}), 502
-        if cr.json():
-            created_or_existing.append(cr.json()[0])
-            continue
-        payload_row = {
-            "user_id": user_id,
-            "project_name": project_name,
-            "version": version,
-            "status": default_status,
-            "created_at": now_iso(),
-        }
-        ins = requests.post(
-            f"{REST_BASE}/{RELEASES_TABLE}",
-            headers={**HEADERS, "Prefer": "return=representation"},
-            data=json.dumps(payload_row),
-            timeout=8,
-        )
+        for row in cr.json():
+            existing.setdefault((row.get("project_name"), row.get("version")), row)
+
+    missing = [pv for pv in unique_pairs if pv not in existing]
+    inserted = []
+    for i in range(0, len(missing), IMPORT_INSERT_CHUNK):
+        chunk = missing[i:i + IMPORT_INSERT_CHUNK]
+        created_at = now_iso()
+        batch = [
+            {"user_id": user_id, "project_name": p, "version": v, "status": default_status, "created_at": created_at}
+            for p, v in chunk
+        ]
+        ins = sb.post(RELEASES_TABLE, headers={"Prefer": "return=representation"}, data=json.dumps(batch))
         if ins.status_code not in (200, 201):
             logging.warning("Supabase insert release failed: %s %s", ins.status_code, ins.text)
+            if inserted:
+                _releases_changed(user_id, created=inserted)
             return jsonify({"error": "failed to insert release"}), 502
-        created_or_existing.append(ins.json()[0])
+        # PostgREST returns inserted rows in request order
+        rows = ins.json()
+        inserted.extend(rows)
+        for pv, row in zip(chunk, rows):
+            existing[pv] = row
+
+    if inserted:
+        _releases_changed(user_id, created=inserted)
 
+    # Same shape as before: one entry per named input row, repeats resolve to the same release
+    created_or_existing = [existing[pv] for pv in pairs]
     return jsonify(created_or_existing), 200
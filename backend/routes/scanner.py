@@ -1,13 +1,63 @@
 import re
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
 
-from ..utils.auth import get_user_from_request
-from ..utils.parsers import parse_requirements_txt, parse_pyproject_toml
-from ..services.pypi_enrich import enrich_from_pypi
+from ..utils.auth import get_user_from_request, get_identity_from_request
+from ..utils.parsers import parse_manifest, unique_packages
+from ..services.pypi_enrich import iter_enrich, result_row
+from ..services import scan_jobs, scan_cache, scan_baselines
 
 bp_scanner = Blueprint("scanner", __name__)
 
+
+def _wants_stream() -> bool:
+    if request.args.get("stream") in ("1", "true"):
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+
+def _wants_refresh() -> bool:
+    if request.args.get("refresh") in ("1", "true"):
+        return True
+    return "no-cache" in (request.headers.get("Cache-Control") or "")
+
+
+def _summary(rows, removed: int) -> dict:
+    # rows are the labeled rows of the current manifest (removed ones excluded)
+    statuses = [r.get("enrichment") for r in rows]
+    diffs = [r.get("diff") for r in rows]
+    return {"total": len(rows), "enriched": statuses.count("ok"),
+            "missing": statuses.count("missing"), "timed_out": statuses.count("timeout"),
+            "added": diffs.count("added"), "changed": diffs.count("changed"),
+            "unchanged": diffs.count("unchanged"), "removed": removed}
+
+
+def _scan_rows(entries, known):
+    # Rows already known (cache or previous scan) first, then PyPI lookups as they finish
+    for i in sorted(known):
+        yield i, known[i]
+    pending = [i for i in range(len(entries)) if i not in known]
+    for j, _, meta, status in iter_enrich([entries[i]["name"] for i in pending]):
+        i = pending[j]
+        yield i, result_row(entries[i], meta, status)
+
+
+def _stream_rows(entries, known, labels, removed_rows, on_complete):
+    # One NDJSON line per package as soon as it is ready, then a summary line.
+    # "index" is the manifest position so clients can keep the usual order;
+    # removed packages follow the manifest rows.
+    rows = [None] * len(entries)
+    labeled = [None] * len(entries)
+    for i, row in _scan_rows(entries, known):
+        rows[i] = row
+        labeled[i] = {**row, "diff": labels[i]}
+        yield json.dumps({"index": i, "row": labeled[i]}) + "\n"
+    on_complete(rows)
+    for k, row in enumerate(removed_rows):
+        yield json.dumps({"index": len(entries) + k, "row": row}) + "\n"
+    yield json.dumps({"summary": _summary(labeled, len(removed_rows))}) + "\n"
+
 @bp_scanner.route("/scan", methods=["POST"])
 def scan():
     user_id, error_response = get_user_from_request()
@@ -24,43 +74,100 @@ def scan():
     if not filename:
         return jsonify({"error": "filename is required"}), 400
 
-    if filename.endswith(".txt"):
-        try:
-            items = parse_requirements_txt(content.decode("utf-8", errors="ignore"))
-        except Exception:
-            return jsonify({"error": "failed to parse requirements.txt"}), 400
-    elif filename.endswith(".toml"):
-        try:
-            items = parse_pyproject_toml(content)
-        except Exception:
-            return jsonify({"error": "failed to parse pyproject.toml (install tomli for Python 3.10)"}), 400
+    # Rows from the previous scan of this project let unchanged packages skip PyPI
+    project = (request.form.get("project") or request.args.get("project") or filename).strip()[:200]
+    refresh = _wants_refresh()
+
+    if request.args.get("async") in ("1", "true"):
+        # Parsing and enrichment happen on the background job workers
+        if not filename.endswith((".txt", ".toml")):
+            return jsonify({"error": "Only requirements.txt or pyproject.toml are supported"}), 400
+        job_id = scan_jobs.enqueue(user_id, filename, content, project, refresh)
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/scan/jobs/{job_id}",
+            "results_url": f"/scan/jobs/{job_id}/results",
+        }), 202
+
+    try:
+        entries = unique_packages(parse_manifest(filename, content))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Identical manifests (same bytes, type and parser version) reuse recent results
+    digest = scan_cache.manifest_digest(filename, content)
+    cached = None if refresh else scan_cache.get(digest)
+    previous = scan_baselines.load(user_id, project)
+    labels, reusable, reused_at, removed = scan_baselines.plan(entries, previous, reuse=not refresh)
+    removed_rows = [{**r, "diff": "removed"} for r in removed]
+
+    if cached is not None:
+        results, cached_at = cached
+        known, cache_status = dict(enumerate(results)), "HIT"
+        known_at = dict.fromkeys(known, cached_at)
     else:
-        return jsonify({"error": "Only requirements.txt or pyproject.toml are supported"}), 400
-
-    # Deduplicate by case-insensitive package name; keep first occurrence/spec
-    unique = {}
-    for it in items:
-        name = (it.get("name") or "").strip()
-        if not name:
-            continue
-        key = name.lower()
-        if key not in unique:
-            unique[key] = {"name": name, "spec": it.get("spec", "")}
-
-    results = []
-    for it in unique.values():
-        name = it.get("name")
-        if not name:
-            continue
-        meta = enrich_from_pypi(name)
-        results.append({
-            "name": name,
-            "spec": it.get("spec", ""),
-            "latest_version": meta.get("latest_version"),
-            "release_date": meta.get("release_date"),
-            "homepage": meta.get("homepage"),
-            "repo_url": meta.get("repo_url"),
-            "pypi_url": meta.get("pypi_url"),
-        })
-
-    return jsonify(results), 200
+        known, known_at, cache_status = reusable, reused_at, ("REFRESH" if refresh else "MISS")
+
+    def on_complete(rows):
+        # Nothing is re-stamped: a HIT leaves the cache entry to expire on schedule,
+        # and reused rows keep the time their PyPI data was actually fetched
+        if cache_status != "HIT":
+            scan_cache.put(digest, rows, fetched_at=min(known_at.values(), default=None))
+        scan_baselines.save(user_id, project, rows, known_at)
+
+    if _wants_stream():
+        stream = _stream_rows(entries, known, labels, removed_rows, on_complete)
+        resp = Response(stream_with_context(stream), mimetype="application/x-ndjson")
+        # Keep proxies from buffering the stream
+        resp.headers["X-Accel-Buffering"] = "no"
+        resp.headers["Cache-Control"] = "no-store"
+        resp.headers["X-Scan-Cache"] = cache_status
+        resp.headers["X-Scan-Reused"] = str(len(known))
+        return resp
+
+    rows = [None] * len(entries)
+    for i, row in _scan_rows(entries, known):
+        rows[i] = row
+    on_complete(rows)
+    results = [{**row, "diff": labels[i]} for i, row in enumerate(rows)]
+
+    # Per-row "enrichment" says which packages timed out; headers carry the totals
+    summary = _summary(results, len(removed_rows))
+    resp = jsonify(results + removed_rows)
+    resp.headers["X-Scan-Enriched"] = str(summary["enriched"])
+    resp.headers["X-Scan-Timed-Out"] = str(summary["timed_out"])
+    resp.headers["X-Scan-Cache"] = cache_status
+    resp.headers["X-Scan-Reused"] = str(len(known))
+    return resp, 200
+
+
+def _load_job(job_id: str, with_results: bool = False):
+    user_id, role, error_response = get_identity_from_request()
+    if error_response:
+        return None, error_response
+    job = scan_jobs.get_job(job_id, with_results=with_results)
+    # Other users' jobs look the same as expired ones
+    if not job or (role != "admin" and job["user_id"] != str(user_id)):
+        return None, (jsonify({"error": "job not found"}), 404)
+    return job, None
+
+@bp_scanner.route("/scan/jobs/<job_id>", methods=["GET"])
+def scan_job_status(job_id):
+    job, error_response = _load_job(job_id)
+    if error_response:
+        return error_response
+    scan_jobs.ensure_workers()
+    return jsonify(job), 200
+
+@bp_scanner.route("/scan/jobs/<job_id>/results", methods=["GET"])
+def scan_job_results(job_id):
+    job, error_response = _load_job(job_id, with_results=True)
+    if error_response:
+        return error_response
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"] or "scan job failed", "status": "failed"}), 422
+    if job["status"] != "done":
+        return jsonify({"error": "scan job not finished", "status": job["status"],
+                        "done": job["done"], "total": job["total"]}), 409
+    return jsonify(job["results"]), 200
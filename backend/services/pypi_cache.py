@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+from ..utils.local_store import get_conn, register_schema
+
+PYPI_CACHE_TTL_SECONDS = int(os.environ.get("PYPI_CACHE_TTL_SECONDS", "3600"))
+PYPI_CACHE_MAX_ENTRIES = int(os.environ.get("PYPI_CACHE_MAX_ENTRIES", "5000"))
+# accessed_at is only rewritten when older than this, to keep hits mostly read-only
+_TOUCH_INTERVAL_SECONDS = 60
+_EVICT_EVERY_WRITES = 50
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS pypi_cache (
+    name TEXT PRIMARY KEY,
+    meta TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pypi_cache_accessed_at ON pypi_cache (accessed_at);
+""")
+
+_stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stale_served": 0, "evictions": 0, "errors": 0}
+_stats_lock = threading.Lock()
+_writes = 0
+
+
+def _bump(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def normalize_name(name: str) -> str:
+    # PEP 503 normalization so "Flask", "flask" and "FLASK" share one entry
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def lookup(key: str):
+    # Returns (meta, etag, last_modified, is_fresh) or None on a miss
+    try:
+        row = get_conn().execute(
+            "SELECT meta, etag, last_modified, fetched_at, accessed_at FROM pypi_cache WHERE name = ?", (key,)
+        ).fetchone()
+        if not row:
+            _bump("misses")
+            return None
+        meta, etag, last_modified, fetched_at, accessed_at = row
+        now = time.time()
+        if now - accessed_at > _TOUCH_INTERVAL_SECONDS:
+            get_conn().execute("UPDATE pypi_cache SET accessed_at = ? WHERE name = ?", (now, key))
+        fresh = now - fetched_at < PYPI_CACHE_TTL_SECONDS
+        _bump("hits" if fresh else "stale")
+        return json.loads(meta), etag, last_modified, fresh
+    except Exception as e:
+        _bump("errors")
+        logging.warning("PyPI cache lookup failed for %s: %s", key, str(e))
+        return None
+
+
+def store(key: str, meta: dict, etag: str = None, last_modified: str = None) -> None:
+    global _writes
+    now = time.time()
+    try:
+        get_conn().execute(
+            "INSERT OR REPLACE INTO pypi_cache (name, meta, etag, last_modified, fetched_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, json.dumps(meta), etag, last_modified, now, now),
+        )
+        with _stats_lock:
+            _writes += 1
+            due = _writes % _EVICT_EVERY_WRITES == 0
+        if due:
+            _evict()
+    except Exception as e:
+        _bump("errors")
+        logging.warning("PyPI cache store failed for %s: %s", key, str(e))
+
+
+def mark_revalidated(key: str) -> None:
+    # Upstream answered 304: the entry is good for another TTL
+    _bump("revalidated")
+    try:
+        now = time.time()
+        get_conn().execute("UPDATE pypi_cache SET fetched_at = ?, accessed_at = ? WHERE name = ?", (now, now, key))
+    except Exception as e:
+        _bump("errors")
+        logging.warning("PyPI cache refresh failed for %s: %s", key, str(e))
+
+
+def mark_stale_served() -> None:
+    _bump("stale_served")
+
+
+def _evict() -> None:
+    # Drop least recently used rows beyond the size bound
+    cur = get_conn().execute(
+        "DELETE FROM pypi_cache WHERE name IN ("
+        "SELECT name FROM pypi_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+        (PYPI_CACHE_MAX_ENTRIES,),
+    )
+    if cur.rowcount:
+        _bump("evictions", cur.rowcount)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        out = dict(_stats)
+    try:
+        out["entries"] = get_conn().execute("SELECT COUNT(*) FROM pypi_cache").fetchone()[0]
+    except Exception:
+        out["entries"] = None
+    out["ttl_seconds"] = PYPI_CACHE_TTL_SECONDS
+    out["max_entries"] = PYPI_CACHE_MAX_ENTRIES
+    return out
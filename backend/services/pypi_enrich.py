@@ -1,47 +1,223 @@
+import os
 import re
-import requests
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-PYPI_JSON = "https://pypi.org/pypi/{name}/json"
+import requests
+from requests.adapters import HTTPAdapter
 
+from . import pypi_cache
+from .pypi_stream import extract_top_level
+from ..utils.singleflight import SingleFlight
+from ..utils import metrics, tracing
 
-def enrich_from_pypi(name: str) -> dict:
-    try:
-        resp = requests.get(PYPI_JSON.format(name=name), timeout=10)
-        if resp.status_code != 200:
-            return {}
-        j = resp.json()
-        info = j.get("info", {})
-        releases = j.get("releases", {})
-        latest = info.get("version")
-        urls = info.get("project_urls") or {}
-        homepage = info.get("home_page") or urls.get("Homepage")
-        repo_url = None
-        preferred_keys = {k.lower() for k in [
-            "Source", "Source Code", "Repository", "Code", "Home", "Homepage"
-        ]}
-        for k, v in urls.items():
-            if k.lower() in preferred_keys and v:
+# JSON API host; point at a mirror (or the load-test stand-in) with PYPI_BASE_URL
+PYPI_BASE_URL = os.environ.get("PYPI_BASE_URL", "https://pypi.org").rstrip("/")
+PYPI_JSON = PYPI_BASE_URL + "/pypi/{name}/json"
+PYPI_TIMEOUT_SECONDS = float(os.environ.get("PYPI_TIMEOUT_SECONDS", "10"))
+# Upper bound on concurrent PyPI lookups for a single scan
+PYPI_MAX_WORKERS = int(os.environ.get("PYPI_MAX_WORKERS", "8"))
+# Lookup threads per process, shared by every concurrent scan; the session keeps
+# the same number of keep-alive connections, so no lookup ever runs without one
+PYPI_POOL_SIZE = int(os.environ.get("PYPI_POOL_SIZE", "32"))
+# Wall-clock budget for enriching one manifest; stays under gunicorn's 30s timeout
+SCAN_DEADLINE_SECONDS = float(os.environ.get("SCAN_DEADLINE_SECONDS", "20"))
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_flights = SingleFlight()
+
+
+def _get_session() -> requests.Session:
+    # One pooled session per process; rebuilt after a gunicorn fork
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(PYPI_POOL_SIZE, 1))
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session, _session_pid = s, pid
+    return _session
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _session_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=max(PYPI_POOL_SIZE, 1), thread_name_prefix="pypi-enrich")
+                _executor_pid = pid
+    return _executor
+
+
+def _extract_meta(j: dict) -> dict:
+    info = j.get("info") or {}
+    latest = info.get("version")
+    urls = info.get("project_urls") or {}
+    homepage = info.get("home_page") or urls.get("Homepage")
+    repo_url = None
+    preferred_keys = {k.lower() for k in [
+        "Source", "Source Code", "Repository", "Code", "Home", "Homepage"
+    ]}
+    for k, v in urls.items():
+        if k.lower() in preferred_keys and v:
+            repo_url = v
+            break
+    if not repo_url:
+        for v in urls.values():
+            if not v:
+                continue
+            if re.search(r"(github|gitlab|bitbucket)\.com/[^\s]+", v, re.IGNORECASE):
                 repo_url = v
                 break
-        if not repo_url:
-            for v in urls.values():
-                if not v:
-                    continue
-                if re.search(r"(github|gitlab|bitbucket)\.com/[^\s]+", v, re.IGNORECASE):
-                    repo_url = v
-                    break
-        release_date = None
-        if latest and latest in releases and releases[latest]:
-            f = releases[latest][0]
-            release_date = f.get("upload_time_iso_8601") or f.get("upload_time")
-        return {
-            "latest_version": latest,
-            "release_date": release_date,
-            "homepage": homepage,
-            "repo_url": repo_url,
-            "pypi_url": f"https://pypi.org/project/{name}/",
-        }
+    # "urls" lists the files of the latest version, same as releases[latest]
+    files = j.get("urls")
+    if files is None:
+        files = (j.get("releases") or {}).get(latest) or []
+    release_date = None
+    if files:
+        f = files[0]
+        release_date = f.get("upload_time_iso_8601") or f.get("upload_time")
+    return {
+        "latest_version": latest,
+        "release_date": release_date,
+        "homepage": homepage,
+        "repo_url": repo_url,
+    }
+
+
+def _with_url(meta: dict, name: str) -> dict:
+    return {**meta, "pypi_url": f"https://pypi.org/project/{name}/"}
+
+
+def _fetch(key: str, name: str, cached, timeout: float) -> dict:
+    # Returns the bare metadata ({} when PyPI has nothing usable); raises on transport errors
+    headers = {}
+    if cached:
+        # Stale entry: ask PyPI whether it changed so an unchanged project costs a 304
+        _, etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    with metrics.upstream("pypi", "GET") as call, tracing.span("pypi.fetch", revalidate=bool(cached)) as span:
+        resp = _get_session().get(PYPI_JSON.format(name=name), headers=headers, timeout=timeout, stream=True)
+        call["outcome"] = metrics.status_class(resp.status_code)
+        span["status"] = resp.status_code
+        with resp:
+            if resp.status_code == 304 and cached:
+                pypi_cache.mark_revalidated(key)
+                return cached[0]
+            if resp.status_code != 200:
+                if cached:
+                    pypi_cache.mark_stale_served()
+                    return cached[0]
+                return {}
+            # Decode only "info" and "urls"; the multi-MB "releases" map is skipped unparsed
+            chunks = resp.iter_content(_STREAM_CHUNK_BYTES)
+            meta = _extract_meta(extract_top_level(chunks, ("info", "urls")))
+            # Drain the small tail so the connection goes back to the pool
+            for _ in chunks:
+                pass
+    pypi_cache.store(key, meta, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    return meta
+
+
+def enrich_from_pypi(name: str, timeout: float = None) -> dict:
+    with tracing.span("pypi.enrich", category="pypi", package=name):
+        return _enrich_from_pypi(name, timeout)
+
+
+def _enrich_from_pypi(name: str, timeout: float = None) -> dict:
+    key = pypi_cache.normalize_name(name)
+    cached = pypi_cache.lookup(key)
+    if cached and cached[3]:
+        return _with_url(cached[0], name)
+
+    timeout = timeout or PYPI_TIMEOUT_SECONDS
+    try:
+        # Concurrent lookups of one project, from any request thread, share a single fetch
+        meta = _flights.do(key, lambda: _fetch(key, name, cached, timeout), timeout=timeout)
     except Exception as e:
         logging.warning("PyPI enrich failed for %s: %s", name, str(e))
-        return {}
+        if not cached:
+            return {}
+        pypi_cache.mark_stale_served()
+        meta = cached[0]
+    return _with_url(meta, name) if meta else {}
+
+
+def singleflight_stats() -> dict:
+    return _flights.stats()
+
+
+def result_row(it: dict, meta: dict, status: str) -> dict:
+    # Shape of one /scan result row for a manifest entry {"name", "spec"}
+    return {
+        "name": it["name"],
+        "spec": it.get("spec", ""),
+        "latest_version": meta.get("latest_version"),
+        "release_date": meta.get("release_date"),
+        "homepage": meta.get("homepage"),
+        "repo_url": meta.get("repo_url"),
+        "pypi_url": meta.get("pypi_url"),
+        "enrichment": status,
+    }
+
+
+# Yields (index, name, meta, status) in completion order. status is "ok",
+# "missing" (PyPI had nothing usable) or "timeout" (deadline hit first);
+# timed-out entries come last, in input order. Lookups run on the shared
+# per-process pool; each scan keeps at most max_workers of them in flight.
+def iter_enrich(names, max_workers: int = None, deadline: float = None):
+    names = list(names)
+    if not names:
+        return
+    window = max(1, min(max_workers or PYPI_MAX_WORKERS, len(names)))
+    budget = SCAN_DEADLINE_SECONDS if deadline is None else deadline
+    ends_at = time.monotonic() + budget
+    per_call_timeout = min(PYPI_TIMEOUT_SECONDS, budget)
+
+    executor = _get_executor()
+    futures, pending, done_indexes = {}, set(), set()
+    queued = iter(range(len(names)))
+
+    def submit_next():
+        i = next(queued, None)
+        if i is not None:
+            fut = executor.submit(tracing.wrap(enrich_from_pypi), names[i], per_call_timeout)
+            futures[fut] = i
+            pending.add(fut)
+
+    for _ in range(window):
+        submit_next()
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=max(ends_at - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                pending.discard(fut)
+                i = futures[fut]
+                done_indexes.add(i)
+                submit_next()
+                meta = fut.result()
+                yield i, names[i], meta, ("ok" if meta else "missing")
+    finally:
+        # Lookups an abandoned or timed-out scan never started leave the shared pool
+        for fut in pending:
+            fut.cancel()
+
+    for i in range(len(names)):
+        if i not in done_indexes:
+            yield i, names[i], {}, "timeout"
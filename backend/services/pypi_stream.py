@@ -0,0 +1,114 @@
+import re
+import json
+import codecs
+
+# Incremental extractor for large top-level JSON objects such as PyPI's project
+# document. Requested keys are decoded whole; every other container (notably the
+# multi-megabyte "releases" map) is walked one member at a time with the C
+# decoder and each member is dropped immediately, so peak memory is roughly one
+# chunk plus the values actually kept, at about json.loads speed.
+
+_WS = re.compile(r"[ \t\r\n]*")
+_VALUE_END = frozenset(" \t\r\n,:]}")
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> None:
+        # Drop consumed text and append the next decoded chunk
+        if self.eof:
+            raise ValueError("truncated JSON document")
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return
+        self.buf = self.buf[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.more()
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r}, got {self.buf[self.pos]!r}")
+        self.pos += 1
+
+    def value(self):
+        # Decode the next value, pulling chunks until it is complete. A value not
+        # followed by a delimiter (e.g. "12" of "12.5") is re-read with more data.
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.more()
+                continue
+            if self.eof or (end < len(self.buf) and self.buf[end] in _VALUE_END):
+                self.pos = end
+                return obj
+            self.more()
+
+    def skip(self) -> None:
+        # Walk a container member by member instead of materializing all of it
+        opener = self.peek()
+        if opener not in "{[":
+            self.value()
+            return
+        closer = "}" if opener == "{" else "]"
+        self.pos += 1
+        if self.peek() == closer:
+            self.pos += 1
+            return
+        while True:
+            if opener == "{":
+                self.value()
+                self.expect(":")
+            self.value()
+            sep = self.peek()
+            self.pos += 1
+            if sep == closer:
+                return
+            if sep != ",":
+                raise ValueError(f"unexpected {sep!r} in container")
+
+
+# Returns as soon as every requested key has been decoded; keys that never
+# appear are simply absent from the result.
+def extract_top_level(chunks, keys) -> dict:
+    wanted = set(keys)
+    found = {}
+    r = _Reader(chunks)
+    r.expect("{")
+    if r.peek() == "}":
+        return found
+    while True:
+        key = r.value()
+        r.expect(":")
+        if key in wanted:
+            found[key] = r.value()
+            if len(found) == len(wanted):
+                return found
+        else:
+            r.skip()
+        sep = r.peek()
+        r.pos += 1
+        if sep == "}":
+            return found
+        if sep != ",":
+            raise ValueError(f"unexpected {sep!r} after {key!r}")
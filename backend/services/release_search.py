@@ -0,0 +1,295 @@
+import os
+import sys
+import math
+import heapq
+import json
+import time
+import bisect
+import logging
+import threading
+
+from ..utils.local_store import get_conn, register_schema
+from ..utils.supabase import RELEASES_TABLE
+from ..utils.pagination import fetch_all_rows
+
+# In-process search index over release project names, one per worker. Prefix
+# matches come from a sorted name list (bisect); substring and fuzzy matches
+# from a trigram -> release ids posting map. Write handlers append changes to
+# release_search_log in the shared SQLite store and every worker replays the
+# log tail before answering, so an edit made through any worker is searchable
+# everywhere on the next query. A full rebuild from Supabase happens at start
+# and every RELEASE_SEARCH_REBUILD_SECONDS (edits made outside the API).
+RELEASE_SEARCH_REBUILD_SECONDS = int(os.environ.get("RELEASE_SEARCH_REBUILD_SECONDS", "900"))
+RELEASE_SEARCH_MIN_SIMILARITY = float(os.environ.get("RELEASE_SEARCH_MIN_SIMILARITY", "0.3"))
+_LOG_RETENTION_SECONDS = 3600
+# How long a search waits for an index that is still being built before 503
+RELEASE_SEARCH_WAIT_SECONDS = float(os.environ.get("RELEASE_SEARCH_WAIT_SECONDS", "5"))
+_BUILD_TIMEOUT_SECONDS = 60
+_DOC_FIELDS = ("id", "user_id", "project_name", "version", "status", "created_at")
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS release_search_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    release_id TEXT NOT NULL,
+    doc TEXT,
+    created_at REAL NOT NULL
+);
+""")
+
+
+class SearchIndexNotReady(Exception):
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("release search index is being built")
+        self.retry_after = retry_after
+
+
+def _trigrams(text: str) -> set:
+    # Padded so short names and word starts still produce grams
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Index:
+    def __init__(self):
+        self.docs = {}      # id -> doc dict (with "_name" lowercased)
+        self.names = []     # sorted (name_lower, id)
+        self.grams = {}     # trigram -> set of ids
+        self.seq = 0        # last release_search_log row applied
+        self.built_at = 0.0
+
+    def put(self, doc: dict) -> None:
+        rid = str(doc.get("id"))
+        self.remove(rid)
+        name = (doc.get("project_name") or "").lower()
+        grams = _trigrams(name)
+        self.docs[rid] = {
+            "id": doc.get("id"),
+            "user_id": str(doc.get("user_id") or ""),
+            "project_name": doc.get("project_name") or "",
+            "version": doc.get("version") or "",
+            "status": doc.get("status") or "",
+            "created_at": doc.get("created_at"),
+            "_name": name,
+            "_grams": len(grams),
+        }
+        bisect.insort(self.names, (name, rid))
+        for g in grams:
+            self.grams.setdefault(g, set()).add(rid)
+
+    def remove(self, rid: str) -> None:
+        old = self.docs.pop(rid, None)
+        if old is None:
+            return
+        i = bisect.bisect_left(self.names, (old["_name"], rid))
+        if i < len(self.names) and self.names[i] == (old["_name"], rid):
+            del self.names[i]
+        for g in _trigrams(old["_name"]):
+            ids = self.grams.get(g)
+            if ids is not None:
+                ids.discard(rid)
+                if not ids:
+                    del self.grams[g]
+
+    def search(self, q: str):
+        # -> {id: (score, match)}; exact > prefix > substring > fuzzy. Fields
+        # starting with "_" are index bookkeeping, not part of the result.
+        q = q.lower()
+        hits = {}
+        i = bisect.bisect_left(self.names, (q, ""))
+        while i < len(self.names) and self.names[i][0].startswith(q):
+            name, rid = self.names[i]
+            hits[rid] = (4.0, "exact") if name == q else (3.0, "prefix")
+            i += 1
+        if len(q) < 3:
+            return hits
+
+        q_grams = _trigrams(q)
+        # Substring: every inner trigram of q must be present
+        inner = [self.grams.get(q[j:j + 3], set()) for j in range(len(q) - 2)]
+        for rid in set.intersection(*sorted(inner, key=len)) if inner else ():
+            if rid not in hits and q in self.docs[rid]["_name"]:
+                hits[rid] = (2.0, "substring")
+        # Fuzzy: trigram Jaccard similarity. A name needs min_shared of q's grams
+        # to reach the threshold, so it must hold one of the rarest
+        # len(q_grams) - min_shared + 1 of them: only those postings are scanned.
+        postings = sorted((self.grams.get(g, set()) for g in q_grams), key=len)
+        min_shared = max(1, math.ceil(RELEASE_SEARCH_MIN_SIMILARITY * len(q_grams)))
+        candidates = set().union(*postings[:len(postings) - min_shared + 1])
+        for rid in candidates:
+            if rid in hits:
+                continue
+            n = sum(1 for ids in postings if rid in ids)
+            similarity = n / (len(q_grams) + self.docs[rid]["_grams"] - n)
+            if similarity >= RELEASE_SEARCH_MIN_SIMILARITY:
+                hits[rid] = (round(similarity, 3), "fuzzy")
+        return hits
+
+    def memory(self) -> dict:
+        # Approximate: container overhead plus the strings they hold
+        docs = sys.getsizeof(self.docs) + sum(
+            sys.getsizeof(d) + sum(sys.getsizeof(v) for v in d.values()) for d in self.docs.values()
+        )
+        names = sys.getsizeof(self.names) + sum(sys.getsizeof(t) for t in self.names)
+        grams = sys.getsizeof(self.grams) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.grams.items())
+        return {
+            "releases": len(self.docs),
+            "trigrams": len(self.grams),
+            "postings": sum(len(v) for v in self.grams.values()),
+            "approx_bytes": {"docs": docs, "prefix": names, "trigrams": grams, "total": docs + names + grams},
+        }
+
+
+_index = None
+_index_pid = None
+_lock = threading.Lock()
+_build_done = None   # Event of this process's latest rebuild; unset while it runs
+_build_pid = None
+_stats = {"builds": 0, "build_errors": 0, "queries": 0, "log_applied": 0}
+
+
+def record(created=(), updated=(), deleted=()) -> None:
+    # Called from the release write handlers with the rows PostgREST returned
+    rows = [(str(r.get("id")), json.dumps(r)) for r in list(created) + list(updated)]
+    rows += [(str(r.get("id")), None) for r in deleted]
+    if not rows:
+        return
+    now = time.time()
+    try:
+        conn = get_conn()
+        conn.executemany(
+            "INSERT INTO release_search_log (release_id, doc, created_at) VALUES (?, ?, ?)",
+            [(rid, doc, now) for rid, doc in rows],
+        )
+        conn.execute("DELETE FROM release_search_log WHERE created_at < ?", (now - _LOG_RETENTION_SECONDS,))
+    except Exception as e:
+        logging.error("Release search log write failed: %s", str(e))
+
+
+def forget_user(user_id) -> None:
+    # After a user delete, whose releases may have gone by cascade
+    try:
+        get_conn().execute(
+            "INSERT INTO release_search_log (release_id, doc, created_at) VALUES (?, NULL, ?)",
+            (f"user:{user_id}", time.time()),
+        )
+    except Exception as e:
+        logging.error("Release search log write failed: %s", str(e))
+
+
+def _apply_log(index: _Index) -> bool:
+    # Replays log rows newer than index.seq; False if rows it needed were pruned
+    conn = get_conn()
+    first = conn.execute("SELECT MIN(seq) FROM release_search_log").fetchone()[0]
+    if first is not None and first > index.seq + 1:
+        return False
+    for seq, rid, doc in conn.execute(
+        "SELECT seq, release_id, doc FROM release_search_log WHERE seq > ? ORDER BY seq", (index.seq,)
+    ):
+        if rid.startswith("user:"):
+            for owned in [k for k, d in index.docs.items() if d["user_id"] == rid[5:]]:
+                index.remove(owned)
+        elif doc is None:
+            index.remove(rid)
+        else:
+            index.put(json.loads(doc))
+        index.seq = seq
+        _stats["log_applied"] += 1
+    return True
+
+
+def _build() -> _Index:
+    index = _Index()
+    # Log position first, so changes made while Supabase is read are replayed after
+    index.seq = get_conn().execute("SELECT COALESCE(MAX(seq), 0) FROM release_search_log").fetchone()[0]
+    # Paged, so PostgREST's max-rows cap cannot drop releases from the index
+    for row in fetch_all_rows(RELEASES_TABLE, _DOC_FIELDS, timeout=_BUILD_TIMEOUT_SECONDS):
+        index.put(row)
+    _apply_log(index)
+    index.built_at = time.monotonic()
+    return index
+
+
+def _rebuild_in_background(done: threading.Event) -> None:
+    # Supabase is read without _lock; only the swap takes it
+    global _index, _index_pid
+    try:
+        index = _build()
+        with _lock:
+            if not _apply_log(index):
+                raise RuntimeError("change log pruned during build")
+            _index, _index_pid = index, os.getpid()
+            _stats["builds"] += 1
+    except Exception as e:
+        with _lock:
+            _stats["build_errors"] += 1
+        logging.error("Release search rebuild failed: %s", str(e))
+    finally:
+        with _lock:
+            done.set()
+
+
+def _start_rebuild() -> threading.Event:
+    # Caller holds _lock. At most one rebuild runs per process; returns its Event
+    global _build_done, _build_pid
+    if _build_done is None or _build_pid != os.getpid() or _build_done.is_set():
+        _build_done, _build_pid = threading.Event(), os.getpid()
+        threading.Thread(target=_rebuild_in_background, args=(_build_done,), name="release-search", daemon=True).start()
+    return _build_done
+
+
+def _current_index():
+    # Caller holds _lock. The index with the log tail applied, or None while none
+    # is usable (not built in this process yet, or too far behind a pruned log)
+    if _index is None or _index_pid != os.getpid() or not _apply_log(_index):
+        return None
+    if time.monotonic() - _index.built_at > RELEASE_SEARCH_REBUILD_SECONDS:
+        _start_rebuild()
+    return _index
+
+
+def ensure_index() -> None:
+    # Started from create_app so the first search does not pay for the build
+    with _lock:
+        if _index is None or _index_pid != os.getpid():
+            _start_rebuild()
+
+
+def search(q: str, user_id=None, status: str = None, version: str = None, limit: int = 20) -> list:
+    # Ranked matches; user_id None means all users (admin). While no usable index
+    # exists, waits up to RELEASE_SEARCH_WAIT_SECONDS for the in-flight build
+    # (never building on this thread), then raises SearchIndexNotReady.
+    for attempt in range(2):
+        with _lock:
+            index = _current_index()
+            if index is not None:
+                _stats["queries"] += 1
+                return _rank(index, q, user_id, status, version, limit)
+            pending = _start_rebuild()
+        if attempt == 0:
+            pending.wait(RELEASE_SEARCH_WAIT_SECONDS)
+    raise SearchIndexNotReady(retry_after=RELEASE_SEARCH_WAIT_SECONDS)
+
+
+def _rank(index: _Index, q: str, user_id, status, version, limit: int) -> list:
+    hits = index.search(q)
+    results = []
+    for rid, (score, match) in hits.items():
+        doc = index.docs[rid]
+        if user_id is not None and doc["user_id"] != str(user_id):
+            continue
+        if status and doc["status"] != status:
+            continue
+        if version and not doc["version"].startswith(version):
+            continue
+        results.append((score, doc["_name"], rid, match))
+    top = heapq.nsmallest(limit, results, key=lambda t: (-t[0], t[1], t[2]))
+    return [
+        {**{k: v for k, v in index.docs[rid].items() if not k.startswith("_")}, "score": score, "match": match}
+        for score, _, rid, match in top
+    ]
+
+
+def stats() -> dict:
+    with _lock:
+        memory = _index.memory() if _index is not None and _index_pid == os.getpid() else None
+        return {**_stats, "index": memory}
@@ -0,0 +1,240 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from ..utils.local_store import get_conn, register_schema
+from ..utils.supabase import RELEASES_TABLE
+from ..utils.pagination import fetch_all_rows
+
+# Release aggregates kept next to the API instead of counted per request.
+# release_mirror holds just enough of each release (owner, project, status,
+# day it became Released) to undo its contribution when it changes;
+# release_stats holds the counters per scope ("*" for everyone, else a
+# user_id) and dimension ("status", "project", "released_day"). Write handlers
+# apply deltas as they succeed; a full reconcile against Supabase runs every
+# RELEASE_STATS_RECONCILE_SECONDS on one worker of the host to correct drift
+# from edits made outside the API.
+RELEASE_STATS_RECONCILE_SECONDS = int(os.environ.get("RELEASE_STATS_RECONCILE_SECONDS", "900"))
+RELEASE_STATS_TOP_PROJECTS = int(os.environ.get("RELEASE_STATS_TOP_PROJECTS", "20"))
+RELEASED = "Released"
+_DAY_BUCKETS_KEPT = 30
+_POLL_SECONDS = 30
+_RECONCILE_TIMEOUT_SECONDS = 60
+_MIRROR_FIELDS = ("id", "user_id", "project_name", "status", "created_at")
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS release_mirror (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    released_on TEXT
+);
+CREATE TABLE IF NOT EXISTS release_stats (
+    scope TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (scope, dim, key)
+);
+CREATE INDEX IF NOT EXISTS release_stats_top ON release_stats (scope, dim, n);
+CREATE TABLE IF NOT EXISTS release_stats_meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+""")
+
+_thread_pid = None
+_thread_lock = threading.Lock()
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _meta(conn, key: str, default=None):
+    row = conn.execute("SELECT value FROM release_stats_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_meta(conn, key: str, value: float) -> None:
+    conn.execute("INSERT OR REPLACE INTO release_stats_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _add(conn, entry, sign: int) -> None:
+    # entry = (user_id, project_name, status, released_on); counted in both scopes
+    user_id, project, status, released_on = entry
+    keys = [("status", status), ("project", project)]
+    if status == RELEASED and released_on:
+        keys.append(("released_day", released_on))
+    for scope in ("*", user_id):
+        for dim, key in keys:
+            conn.execute(
+                "INSERT INTO release_stats (scope, dim, key, n) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(scope, dim, key) DO UPDATE SET n = n + excluded.n",
+                (scope, dim, key, sign),
+            )
+
+
+def _apply(conn, rows, deleted: bool) -> None:
+    for row in rows:
+        rid = str(row.get("id"))
+        old = conn.execute(
+            "SELECT user_id, project_name, status, released_on FROM release_mirror WHERE id = ?", (rid,)
+        ).fetchone()
+        if old:
+            _add(conn, old, -1)
+        if deleted:
+            conn.execute("DELETE FROM release_mirror WHERE id = ?", (rid,))
+            continue
+        user_id = str(row.get("user_id") if row.get("user_id") is not None else (old[0] if old else ""))
+        project = row.get("project_name") or (old[1] if old else "")
+        status = row.get("status") or (old[2] if old else "")
+        released_on = None
+        if status == RELEASED:
+            released_on = old[3] if old and old[2] == RELEASED else _today()
+        entry = (user_id, project, status, released_on)
+        conn.execute(
+            "INSERT OR REPLACE INTO release_mirror (id, user_id, project_name, status, released_on) VALUES (?, ?, ?, ?, ?)",
+            (rid, *entry),
+        )
+        _add(conn, entry, 1)
+
+
+def apply(created=(), updated=(), deleted=()) -> None:
+    # Called by the release write handlers with the rows PostgREST returned
+    if not (created or updated or deleted):
+        return
+    try:
+        conn = get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+    except Exception as e:
+        logging.error("Release stats update skipped, scheduling reconcile: %s", str(e))
+        request_reconcile()
+        return
+    try:
+        _apply(conn, list(created) + list(updated), deleted=False)
+        _apply(conn, deleted, deleted=True)
+        _set_meta(conn, "seq", _meta(conn, "seq", 0) + 1)
+        conn.execute("COMMIT")
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        logging.error("Release stats update failed, scheduling reconcile: %s", str(e))
+        request_reconcile()
+
+
+def request_reconcile() -> None:
+    # e.g. after a user delete that may have cascaded to their releases
+    try:
+        _set_meta(get_conn(), "reconcile_claimed_at", 0)
+    except Exception as e:
+        logging.warning("Release stats reconcile request failed: %s", str(e))
+
+
+def reconcile() -> bool:
+    # Rebuilds the mirror and counters from Supabase. Skipped (False) if API writes
+    # landed while the snapshot was being fetched; the next poll tries again.
+    conn = get_conn()
+    seq = _meta(conn, "seq", 0)
+    # Every page is read before the transaction; a failed page leaves the old state
+    try:
+        rows = fetch_all_rows(RELEASES_TABLE, _MIRROR_FIELDS, timeout=_RECONCILE_TIMEOUT_SECONDS)
+    except RuntimeError as e:
+        logging.error("Release stats reconcile fetch failed: %s", str(e))
+        return False
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if _meta(conn, "seq", 0) != seq:
+            conn.execute("ROLLBACK")
+            return False
+        # Keep the known "became Released" day; otherwise fall back to created_at
+        released_on = dict(conn.execute("SELECT id, released_on FROM release_mirror WHERE released_on IS NOT NULL"))
+        conn.execute("DELETE FROM release_mirror")
+        conn.execute("DELETE FROM release_stats")
+        cutoff = (datetime.now(timezone.utc).date() - timedelta(days=_DAY_BUCKETS_KEPT)).isoformat()
+        for row in rows:
+            rid = str(row.get("id"))
+            status = row.get("status") or ""
+            day = None
+            if status == RELEASED:
+                day = released_on.get(rid) or (row.get("created_at") or "")[:10] or _today()
+            entry = (str(row.get("user_id") or ""), row.get("project_name") or "", status, day)
+            conn.execute(
+                "INSERT INTO release_mirror (id, user_id, project_name, status, released_on) VALUES (?, ?, ?, ?, ?)",
+                (rid, *entry),
+            )
+            _add(conn, entry, 1)
+        conn.execute("DELETE FROM release_stats WHERE dim = 'released_day' AND key < ?", (cutoff,))
+        _set_meta(conn, "reconciled_at", time.time())
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return True
+
+
+def _claim_reconcile() -> bool:
+    # One worker per host reconciles: the claim timestamp tells the others it is
+    # taken (a run that dies is retried after one interval)
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        last = _meta(conn, "reconcile_claimed_at", 0)
+        due = time.time() - last >= RELEASE_STATS_RECONCILE_SECONDS
+        if due:
+            _set_meta(conn, "reconcile_claimed_at", time.time())
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return due
+
+
+def _reconcile_loop() -> None:
+    while True:
+        try:
+            if _claim_reconcile() and not reconcile():
+                request_reconcile()  # writes raced the snapshot; retry on the next poll
+        except Exception as e:
+            logging.error("Release stats reconcile failed: %s", str(e))
+        time.sleep(_POLL_SECONDS)
+
+
+def ensure_reconciler() -> None:
+    global _thread_pid
+    if RELEASE_STATS_RECONCILE_SECONDS <= 0 or _thread_pid == os.getpid():
+        return
+    with _thread_lock:
+        if _thread_pid == os.getpid():
+            return
+        threading.Thread(target=_reconcile_loop, name="release-stats", daemon=True).start()
+        _thread_pid = os.getpid()
+
+
+def snapshot(scope: str) -> dict:
+    # Reads a handful of counter rows; cost does not depend on the number of releases
+    conn = get_conn()
+    by_status = dict(conn.execute(
+        "SELECT key, n FROM release_stats WHERE scope = ? AND dim = 'status' AND n > 0", (scope,)
+    ))
+    top = conn.execute(
+        "SELECT key, n FROM release_stats WHERE scope = ? AND dim = 'project' AND n > 0 ORDER BY n DESC, key LIMIT ?",
+        (scope, RELEASE_STATS_TOP_PROJECTS),
+    ).fetchall()
+    today = datetime.now(timezone.utc).date()
+    week = [(today - timedelta(days=d)).isoformat() for d in range(6, -1, -1)]
+    days = dict(conn.execute(
+        "SELECT key, n FROM release_stats WHERE scope = ? AND dim = 'released_day' AND key >= ?", (scope, week[0])
+    ))
+    reconciled_at = _meta(conn, "reconciled_at", 0)
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "top_projects": [{"project_name": k, "count": n} for k, n in top],
+        "released_this_week": sum(days.get(d, 0) for d in week),
+        "released_by_day": {d: days.get(d, 0) for d in week},
+        "reconciled_at": datetime.fromtimestamp(reconciled_at, timezone.utc).isoformat() if reconciled_at else None,
+    }
@@ -0,0 +1,110 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from ..utils.singleflight import SingleFlight
+
+# In-process cache of release listings, keyed by the PostgREST query (which
+# already encodes the user/admin scope, filters and page). Each entry remembers
+# the scope generation stamp it was fetched under; API writes bump the stamp in
+# the shared SQLite store, so every worker sees the change on its next read
+# without any cross-process messaging.
+#
+# An entry whose stamp still matches is fresh for RELEASES_CACHE_TTL_SECONDS
+# (bounding how long edits made directly in Supabase stay hidden). After that it
+# is served for up to RELEASES_CACHE_SWR_SECONDS more while one background
+# refresh runs. Older or invalidated entries are only used when Supabase fails.
+RELEASES_CACHE_TTL_SECONDS = float(os.environ.get("RELEASES_CACHE_TTL_SECONDS", "30"))
+RELEASES_CACHE_SWR_SECONDS = float(os.environ.get("RELEASES_CACHE_SWR_SECONDS", "300"))
+RELEASES_CACHE_MAX_ENTRIES = int(os.environ.get("RELEASES_CACHE_MAX_ENTRIES", "500"))
+RELEASES_CACHE_MAX_ROWS = int(os.environ.get("RELEASES_CACHE_MAX_ROWS", "100000"))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (stamp, rows, fetched_at)
+_rows_held = 0
+_flights = SingleFlight()
+_refreshing = set()
+_counters = {"hits": 0, "misses": 0, "stale": 0, "fallbacks": 0, "refreshes": 0, "evictions": 0, "errors": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def _put(key, stamp, rows) -> None:
+    global _rows_held
+    with _lock:
+        old = _entries.pop(key, None)
+        if old:
+            _rows_held -= len(old[1])
+        if len(rows) > RELEASES_CACHE_MAX_ROWS:
+            return
+        _entries[key] = (stamp, rows, time.monotonic())
+        _rows_held += len(rows)
+        while len(_entries) > RELEASES_CACHE_MAX_ENTRIES or _rows_held > RELEASES_CACHE_MAX_ROWS:
+            _, (_, evicted, _) = _entries.popitem(last=False)
+            _rows_held -= len(evicted)
+            _counters["evictions"] += 1
+
+
+def _load(key, stamp, fetch):
+    # Concurrent misses for the same query share one upstream call
+    rows = _flights.do((key, stamp), fetch)
+    _put(key, stamp, rows)
+    return rows
+
+
+def _refresh(key, stamp, fetch) -> None:
+    try:
+        _load(key, stamp, fetch)
+        _count("refreshes")
+    except Exception as e:
+        _count("errors")
+        logging.warning("Background releases refresh failed: %s", str(e))
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def get(key, stamp, fetch):
+    # Returns (rows, state) with state HIT, MISS, STALE (served while refreshing)
+    # or FALLBACK (Supabase failed, older copy served). fetch() returns the rows
+    # or raises; it is re-raised only when there is nothing cached to fall back on.
+    if stamp is None:
+        return fetch(), "MISS"
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry:
+            _entries.move_to_end(key)
+    if entry and entry[0] == stamp:
+        age = time.monotonic() - entry[2]
+        if age < RELEASES_CACHE_TTL_SECONDS:
+            _count("hits")
+            return entry[1], "HIT"
+        if age < RELEASES_CACHE_TTL_SECONDS + RELEASES_CACHE_SWR_SECONDS:
+            with _lock:
+                start = key not in _refreshing
+                _refreshing.add(key)
+            if start:
+                threading.Thread(target=_refresh, args=(key, stamp, fetch), daemon=True).start()
+            _count("stale")
+            return entry[1], "STALE"
+
+    _count("misses")
+    try:
+        return _load(key, stamp, fetch), "MISS"
+    except Exception:
+        _count("errors")
+        if entry is None:
+            raise
+        _count("fallbacks")
+        return entry[1], "FALLBACK"
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_counters, "entries": len(_entries), "rows": _rows_held}
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import logging
+
+from ..utils.local_store import get_conn, register_schema
+
+# Last scanned manifest per (user, project), used to re-enrich only what changed.
+# Each stored row remembers when its PyPI data was fetched; a row older than
+# SCAN_BASELINE_TTL_SECONDS still drives the diff label but is re-enriched, so
+# "unchanged" packages do not show a stale latest version forever. Reusing a
+# row keeps its original fetch time.
+SCAN_BASELINE_TTL_SECONDS = int(os.environ.get("SCAN_BASELINE_TTL_SECONDS", "86400"))
+_FETCHED = "_fetched_at"
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS scan_baselines (
+    user_id TEXT NOT NULL,
+    project TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, project)
+);
+""")
+
+
+def load(user_id, project: str):
+    # Returns the stored rows (each carrying its fetch time) or None
+    try:
+        row = get_conn().execute(
+            "SELECT rows, updated_at FROM scan_baselines WHERE user_id = ? AND project = ?",
+            (str(user_id), project),
+        ).fetchone()
+    except Exception as e:
+        logging.warning("Scan baseline lookup failed: %s", str(e))
+        return None
+    if not row:
+        return None
+    rows = json.loads(row[0])
+    for r in rows:
+        # Baselines stored before per-row times count as fetched when saved
+        r.setdefault(_FETCHED, row[1])
+    return rows
+
+
+def save(user_id, project: str, rows: list, fetched_at: dict) -> None:
+    # fetched_at maps index -> fetch time of rows reused from earlier; other rows were fetched now
+    now = time.time()
+    stored = [{**r, _FETCHED: fetched_at.get(i, now)} for i, r in enumerate(rows)]
+    try:
+        get_conn().execute(
+            "INSERT OR REPLACE INTO scan_baselines (user_id, project, rows, updated_at) VALUES (?, ?, ?, ?)",
+            (str(user_id), project, json.dumps(stored), now),
+        )
+    except Exception as e:
+        logging.warning("Scan baseline store failed: %s", str(e))
+
+
+def _public(row: dict) -> dict:
+    return {k: v for k, v in row.items() if k != _FETCHED}
+
+
+# Compares parsed entries with the previous scan's rows. Returns (labels,
+# reusable, fetched_at, removed): labels[i] is "added", "changed" or
+# "unchanged"; reusable maps index -> previous row that can be returned as-is
+# (unchanged and fetched within the TTL) and fetched_at the same indexes to
+# when that row was fetched; removed lists previous rows missing from this
+# manifest.
+def plan(entries: list, previous, reuse: bool):
+    prev_by_name = {r["name"].lower(): r for r in (previous or [])}
+    labels, reusable, fetched_at = [], {}, {}
+    fresh_after = time.time() - SCAN_BASELINE_TTL_SECONDS
+    for i, it in enumerate(entries):
+        prev = prev_by_name.pop(it["name"].lower(), None)
+        if prev is None:
+            labels.append("added")
+        elif (prev.get("spec") or "") != (it.get("spec") or ""):
+            labels.append("changed")
+        else:
+            labels.append("unchanged")
+            fetched = prev.get(_FETCHED) or 0
+            if reuse and prev.get("enrichment") != "timeout" and fetched > fresh_after:
+                reusable[i] = {**_public(prev), "name": it["name"]}
+                fetched_at[i] = fetched
+    removed = [_public(r) for r in prev_by_name.values()] if previous is not None else []
+    return labels, reusable, fetched_at, removed
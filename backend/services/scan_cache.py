@@ -0,0 +1,65 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+from ..utils.local_store import get_conn, register_schema
+from ..utils.parsers import PARSER_VERSION
+
+# Enriched /scan results keyed by manifest hash, shared by all workers
+SCAN_RESULT_TTL_SECONDS = int(os.environ.get("SCAN_RESULT_TTL_SECONDS", "600"))
+_PRUNE_EVERY_WRITES = 20
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS scan_results (
+    digest TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+""")
+
+_writes = 0
+
+
+def manifest_digest(filename: str, content: bytes) -> str:
+    # The extension picks the parser, so it is part of the key alongside the bytes
+    kind = os.path.splitext(filename)[1].lower()
+    h = hashlib.sha256()
+    h.update(f"{PARSER_VERSION}\0{kind}\0".encode("utf-8"))
+    h.update(content)
+    return h.hexdigest()
+
+
+def get(digest: str):
+    # Returns (results, created_at) or None
+    try:
+        row = get_conn().execute(
+            "SELECT results, created_at FROM scan_results WHERE digest = ? AND created_at > ?",
+            (digest, time.time() - SCAN_RESULT_TTL_SECONDS),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+    except Exception as e:
+        logging.warning("Scan result cache lookup failed: %s", str(e))
+        return None
+
+
+def put(digest: str, results: list, fetched_at: float = None) -> None:
+    # Partial scans are not cached; the next upload should retry the timed-out packages.
+    # fetched_at is when the oldest row's PyPI data was fetched (rows reused from a
+    # baseline), so the entry expires SCAN_RESULT_TTL_SECONDS after that, not after now.
+    global _writes
+    if any(r.get("enrichment") == "timeout" for r in results):
+        return
+    try:
+        conn = get_conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO scan_results (digest, results, created_at) VALUES (?, ?, ?)",
+            (digest, json.dumps(results), now if fetched_at is None else min(fetched_at, now)),
+        )
+        _writes += 1
+        if _writes % _PRUNE_EVERY_WRITES == 0:
+            conn.execute("DELETE FROM scan_results WHERE created_at <= ?", (now - SCAN_RESULT_TTL_SECONDS,))
+    except Exception as e:
+        logging.warning("Scan result cache store failed: %s", str(e))
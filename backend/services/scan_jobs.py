@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+
+from ..utils.local_store import get_conn, register_schema, register_columns
+from ..utils.parsers import parse_manifest, unique_packages
+from .pypi_enrich import iter_enrich, result_row
+from . import scan_cache, scan_baselines
+
+# Background scan jobs. The queue lives in the shared SQLite store, so jobs
+# survive worker restarts: a job whose lease expires (its worker died) is
+# picked up again by any worker on the host. Jobs go through the same result
+# cache and per-project baseline as the synchronous /scan, so rows carry the
+# same "diff" labels and either path can follow the other.
+SCAN_JOB_WORKERS = int(os.environ.get("SCAN_JOB_WORKERS", "2"))
+SCAN_JOB_RETENTION_SECONDS = int(os.environ.get("SCAN_JOB_RETENTION_SECONDS", "3600"))
+SCAN_JOB_DEADLINE_SECONDS = float(os.environ.get("SCAN_JOB_DEADLINE_SECONDS", "300"))
+SCAN_JOB_MAX_ATTEMPTS = 3
+_LEASE_SECONDS = 30
+_POLL_SECONDS = 1.0
+_PRUNE_EVERY_SECONDS = 60
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS scan_jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    content BLOB,
+    status TEXT NOT NULL,
+    total INTEGER,
+    done INTEGER NOT NULL DEFAULT 0,
+    results TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_jobs_status ON scan_jobs (status, created_at);
+""")
+register_columns("scan_jobs", {"project": "TEXT", "refresh": "INTEGER NOT NULL DEFAULT 0"})
+
+_wakeup = threading.Event()
+_workers_pid = None
+_workers_lock = threading.Lock()
+
+
+def ensure_workers() -> None:
+    # Worker threads do not survive fork, so each gunicorn worker starts its own
+    global _workers_pid
+    if SCAN_JOB_WORKERS <= 0 or _workers_pid == os.getpid():
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        for i in range(SCAN_JOB_WORKERS):
+            threading.Thread(target=_worker_loop, name=f"scan-job-{i}", daemon=True).start()
+        _workers_pid = os.getpid()
+
+
+def enqueue(user_id: str, filename: str, content: bytes, project: str, refresh: bool = False) -> str:
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    get_conn().execute(
+        "INSERT INTO scan_jobs (id, user_id, filename, content, project, refresh, status, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)",
+        (job_id, str(user_id), filename, content, project, int(refresh), now, now),
+    )
+    ensure_workers()
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id: str, with_results: bool = False):
+    cols = "id, user_id, filename, status, total, done, error, created_at, updated_at"
+    if with_results:
+        cols += ", results"
+    row = get_conn().execute(f"SELECT {cols} FROM scan_jobs WHERE id = ?", (job_id,)).fetchone()
+    if not row:
+        return None
+    job = dict(zip([c.strip() for c in cols.split(",")], row))
+    if with_results:
+        job["results"] = json.loads(job["results"]) if job["results"] else None
+    job["expires_at"] = job["updated_at"] + SCAN_JOB_RETENTION_SECONDS if job["status"] in ("done", "failed") else None
+    return job
+
+
+def _claim():
+    # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+    conn = get_conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, user_id, filename, content, project, refresh, attempts FROM scan_jobs "
+            "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+            "ORDER BY created_at LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE scan_jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                "WHERE id = ?",
+                (now + _LEASE_SECONDS, now, row[0]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _finish(job_id: str, status: str, results=None, error: str = None) -> None:
+    get_conn().execute(
+        "UPDATE scan_jobs SET status = ?, results = ?, error = ?, content = NULL, lease_until = NULL, updated_at = ? "
+        "WHERE id = ?",
+        (status, json.dumps(results) if results is not None else None, error, time.time(), job_id),
+    )
+
+
+def _run(job_id: str, user_id: str, filename: str, content: bytes, project, refresh: bool) -> None:
+    try:
+        entries = unique_packages(parse_manifest(filename, content))
+    except ValueError as e:
+        _finish(job_id, "failed", error=str(e))
+        return
+
+    # Same reuse rules as the synchronous /scan: a cached result for identical
+    # bytes, else unchanged rows from the project's previous scan
+    digest = scan_cache.manifest_digest(filename, content)
+    cached = None if refresh else scan_cache.get(digest)
+    project = project or filename
+    previous = scan_baselines.load(user_id, project)
+    labels, reusable, reused_at, removed = scan_baselines.plan(entries, previous, reuse=not refresh)
+    if cached is not None:
+        known = dict(enumerate(cached[0]))
+        known_at = dict.fromkeys(known, cached[1])
+    else:
+        known, known_at = reusable, reused_at
+
+    results = [None] * len(entries)
+    for i, row in known.items():
+        results[i] = row
+    pending = [i for i in range(len(entries)) if i not in known]
+    done = len(known)
+    conn = get_conn()
+    conn.execute("UPDATE scan_jobs SET total = ?, done = ? WHERE id = ?", (len(entries), done, job_id))
+    last_update = time.monotonic()
+    names = [entries[i]["name"] for i in pending]
+    for j, _, meta, status in iter_enrich(names, deadline=SCAN_JOB_DEADLINE_SECONDS):
+        i = pending[j]
+        results[i] = result_row(entries[i], meta, status)
+        done += 1
+        # Progress and lease renewal at most twice a second
+        if time.monotonic() - last_update > 0.5:
+            now = time.time()
+            conn.execute(
+                "UPDATE scan_jobs SET done = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (done, now + _LEASE_SECONDS, now, job_id),
+            )
+            last_update = time.monotonic()
+    conn.execute("UPDATE scan_jobs SET done = ? WHERE id = ?", (done, job_id))
+    if cached is None:
+        scan_cache.put(digest, results, fetched_at=min(known_at.values(), default=None))
+    scan_baselines.save(user_id, project, results, known_at)
+    labeled = [{**row, "diff": labels[i]} for i, row in enumerate(results)]
+    _finish(job_id, "done", results=labeled + [{**r, "diff": "removed"} for r in removed])
+
+
+def _prune() -> None:
+    cutoff = time.time() - SCAN_JOB_RETENTION_SECONDS
+    get_conn().execute("DELETE FROM scan_jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,))
+
+
+def _worker_loop() -> None:
+    last_prune = 0.0
+    while True:
+        try:
+            if time.monotonic() - last_prune > _PRUNE_EVERY_SECONDS:
+                _prune()
+                last_prune = time.monotonic()
+            job = _claim()
+            if not job:
+                _wakeup.wait(_POLL_SECONDS)
+                _wakeup.clear()
+                continue
+            job_id, user_id, filename, content, project, refresh, attempts = job
+            if attempts >= SCAN_JOB_MAX_ATTEMPTS:
+                _finish(job_id, "failed", error="scan job failed repeatedly")
+                continue
+            _run(job_id, user_id, filename, content, project, bool(refresh))
+        except Exception as e:
+            logging.error("Scan job worker error: %s", str(e))
+            time.sleep(_POLL_SECONDS)
@@ -1,27 +1,39 @@
 import jwt
+import uuid
 import logging
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
-from flask import request, jsonify
+from flask import request, jsonify, g
 
 from .supabase import JWT_SECRET, JWT_EXP_SECONDS
+from . import identity_cache, revocation, tracing
 
 
 def create_jwt(payload: dict) -> str:
     exp = datetime.utcnow() + timedelta(seconds=JWT_EXP_SECONDS)
-    p = {**payload, "exp": exp, "iat": datetime.utcnow()}
+    p = {**payload, "exp": exp, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex}
     token = jwt.encode(p, JWT_SECRET, algorithm="HS256")
     return token if isinstance(token, str) else token.decode("utf-8")
 
 
 def verify_jwt(token: str):
+    with tracing.span("jwt.verify", category="auth"):
+        return _verify_jwt(token)
+
+
+def _verify_jwt(token: str):
+    claims = identity_cache.get_claims(token)
+    if claims is not None:
+        return None if revocation.is_revoked(claims) else claims
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
         return None
     except Exception as e:
         logging.debug("JWT verify failed: %s", str(e))
         return None
+    identity_cache.put_claims(token, claims)
+    return None if revocation.is_revoked(claims) else claims
 
 
 def get_user_from_request():
@@ -32,6 +44,7 @@ def get_user_from_request():
     data = verify_jwt(token)
     if not data or not data.get("user_id"):
         return None, (jsonify({"error": "invalid or expired token"}), 401)
+    g.jwt_claims = data
     return data.get("user_id"), None
 
 
@@ -43,6 +56,7 @@ def get_identity_from_request() -> Tuple[Optional[str], Optional[str], Optional[
     data = verify_jwt(token)
     if not data or not data.get("user_id"):
         return None, None, (jsonify({"error": "invalid or expired token"}), 401)
+    g.jwt_claims = data
     return data.get("user_id"), data.get("role"), None
 
 
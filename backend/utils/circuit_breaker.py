@@ -0,0 +1,60 @@
+import time
+import threading
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    # closed: calls pass, consecutive failures are counted. After `threshold` of
+    # them it opens and rejects calls for `cooldown` seconds; then it goes
+    # half-open and lets a single probe through, whose outcome closes it again
+    # or re-opens it for another cooldown.
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opens = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == "closed":
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if self._state == "open" and remaining <= 0:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(max(remaining, 0.0))
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._state, self._failures = "closed", 0
+                return
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.threshold:
+                if self._state != "open":
+                    self.opens += 1
+                self._state, self._opened_at = "open", time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
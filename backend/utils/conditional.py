@@ -0,0 +1,78 @@
+import hashlib
+import logging
+
+from flask import request, Response
+
+from .local_store import get_conn, register_schema
+
+# Conditional GET for listings. Each scope ("releases", "releases:<user_id>",
+# "users", ...) has a generation counter in the shared SQLite store that write
+# handlers bump after Supabase accepts the change, so an ETag can be computed
+# before touching Supabase and a matching If-None-Match is answered with 304.
+# Changes made directly in Supabase (outside this API) are not seen until the
+# next write through the API bumps the scope.
+register_schema("""
+CREATE TABLE IF NOT EXISTS generations (
+    scope TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+""")
+
+
+def bump(*scopes) -> None:
+    try:
+        conn = get_conn()
+        for scope in dict.fromkeys(scopes):
+            conn.execute(
+                "INSERT INTO generations (scope, value) VALUES (?, 1) "
+                "ON CONFLICT(scope) DO UPDATE SET value = value + 1",
+                (scope,),
+            )
+    except Exception as e:
+        logging.error("Generation bump failed for %s: %s", scopes, str(e))
+
+
+def stamp(scopes):
+    # Current generations of the scopes as one string; None if the store is unavailable
+    try:
+        conn = get_conn()
+        gens = []
+        for scope in scopes:
+            row = conn.execute("SELECT value FROM generations WHERE scope = ?", (scope,)).fetchone()
+            gens.append(f"{scope}={row[0] if row else 0}")
+    except Exception as e:
+        logging.warning("Generation lookup failed: %s", str(e))
+        return None
+    return ",".join(gens)
+
+
+def etag_from(gen_stamp, *identity):
+    # Strong ETag over the generations, the caller and the full query string
+    if gen_stamp is None:
+        return None
+    key = "|".join([request.full_path, *map(str, identity), gen_stamp])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def etag_for(scopes, *identity):
+    return etag_from(stamp(scopes), *identity)
+
+
+def not_modified(etag):
+    # 304 response if If-None-Match matches; flask-compress sends strong ETags as
+    # "<etag>:gzip" (or :br), so those variants match too
+    if not etag:
+        return None
+    inm = request.if_none_match
+    if not inm:
+        return None
+    for tag in inm.as_set(include_weak=True):
+        if tag == etag or tag.startswith(etag + ":"):
+            resp = Response(status=304)
+            resp.set_etag(tag)
+            return resp
+    if inm.star_tag:
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+    return None
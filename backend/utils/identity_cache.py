@@ -0,0 +1,103 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Per-worker caches for the two identity lookups every request makes:
+#   tokens:   verified JWT claims keyed by a digest of the token, kept until the
+#             token's exp, so a reused token is decoded and HMAC-checked once.
+#   profiles: the /me user row, kept for IDENTITY_PROFILE_TTL_SECONDS (never past
+#             the caller's token exp) under the "users:<id>" generation stamp.
+#             Role changes and deletes bump that generation in the shared SQLite
+#             store, which invalidates the entry in every worker.
+IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+IDENTITY_PROFILE_TTL_SECONDS = float(os.environ.get("IDENTITY_PROFILE_TTL_SECONDS", "60"))
+
+_lock = threading.Lock()
+_tokens = OrderedDict()    # digest -> (claims, expires_at epoch)
+_profiles = OrderedDict()  # user_id -> (stamp, profile, expires_at epoch)
+_counters = {"token_hits": 0, "token_misses": 0, "profile_hits": 0, "profile_misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+def _put(entries: OrderedDict, key, value) -> None:
+    entries[key] = value
+    entries.move_to_end(key)
+    while len(entries) > IDENTITY_CACHE_MAX_ENTRIES:
+        entries.popitem(last=False)
+        _counters["evictions"] += 1
+
+
+def get_claims(token: str):
+    # Cached claims, or None on a miss (callers then verify and put_claims)
+    key = _digest(token)
+    with _lock:
+        entry = _tokens.get(key)
+        if entry and entry[1] > time.time():
+            _tokens.move_to_end(key)
+            _counters["token_hits"] += 1
+            return entry[0]
+        if entry:
+            del _tokens[key]
+        _counters["token_misses"] += 1
+    return None
+
+
+def put_claims(token: str, claims: dict) -> None:
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    with _lock:
+        _put(_tokens, _digest(token), (claims, float(exp)))
+
+
+def get_profile(user_id, stamp):
+    if stamp is None:
+        return None
+    key = str(user_id)
+    with _lock:
+        entry = _profiles.get(key)
+        if entry and entry[0] == stamp and entry[2] > time.time():
+            _profiles.move_to_end(key)
+            _counters["profile_hits"] += 1
+            return entry[1]
+        if entry:
+            del _profiles[key]
+        _counters["profile_misses"] += 1
+    return None
+
+
+def put_profile(user_id, stamp, profile: dict, not_after=None) -> None:
+    if stamp is None:
+        return
+    expires_at = time.time() + IDENTITY_PROFILE_TTL_SECONDS
+    if isinstance(not_after, (int, float)):
+        expires_at = min(expires_at, float(not_after))
+    with _lock:
+        _put(_profiles, str(user_id), (stamp, profile, expires_at))
+
+
+def invalidate_user(user_id) -> None:
+    # Local drop; other workers notice through the bumped users:<id> generation
+    with _lock:
+        if _profiles.pop(str(user_id), None) is not None:
+            _counters["invalidations"] += 1
+
+
+def _rate(hits: int, misses: int):
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            **_counters,
+            "token_hit_rate": _rate(_counters["token_hits"], _counters["token_misses"]),
+            "profile_hit_rate": _rate(_counters["profile_hits"], _counters["profile_misses"]),
+            "tokens": len(_tokens),
+            "profiles": len(_profiles),
+        }
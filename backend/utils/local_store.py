@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+# Single SQLite file shared by every gunicorn worker on the host
+LOCAL_STORE_PATH = os.environ.get("LOCAL_STORE_PATH") or os.path.join(
+    tempfile.gettempdir(), "release-tracker.sqlite3"
+)
+
+_schema = []
+_local = threading.local()
+
+
+def register_schema(ddl: str) -> None:
+    # Modules declare their tables at import time; applied on each new connection
+    _schema.append(ddl)
+
+
+def register_columns(table: str, columns: dict) -> None:
+    # Columns added after a table first shipped: {name: "TYPE ..."}, added to
+    # files created by an older version on each new connection
+    def apply(conn):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns.items():
+            if name not in existing:
+                try:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                except sqlite3.OperationalError:
+                    # Another worker added it first
+                    pass
+    _schema.append(apply)
+
+
+def get_conn() -> sqlite3.Connection:
+    # One connection per thread, reopened after fork (sqlite handles must not cross processes)
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(LOCAL_STORE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn, _local.pid, _local.applied = conn, os.getpid(), 0
+    if _local.applied < len(_schema):
+        for ddl in _schema[_local.applied:]:
+            if callable(ddl):
+                ddl(conn)
+            else:
+                conn.executescript(ddl)
+        _local.applied = len(_schema)
+    return conn
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import request, g
+
+from .local_store import get_conn, register_schema
+
+# Prometheus-style counters, gauges and histograms. Recording only touches
+# in-process dicts; a background thread per worker writes changed series to
+# the shared SQLite store every METRICS_FLUSH_SECONDS, and /metrics sums the
+# series of every worker seen in the last METRICS_WORKER_TTL_SECONDS so a
+# scrape sees the whole host rather than whichever worker answered it.
+# Counters and histograms of workers that stop reporting are folded into
+# RETIRED_PID rows so host-wide totals never go down (Prometheus would read
+# a drop as a counter reset); their gauges are dropped.
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "5"))
+METRICS_WORKER_TTL_SECONDS = float(os.environ.get("METRICS_WORKER_TTL_SECONDS", "60"))
+PREFIX = "release_tracker_"
+RETIRED_PID = 0
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# name -> (type, help)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency until the response is closed."),
+    "http_requests_in_flight": ("gauge", "HTTP requests being handled."),
+    "upstream_request_duration_seconds": ("histogram", "Outbound call latency by upstream (supabase, pypi) and outcome."),
+    "upstream_requests_in_flight": ("gauge", "Outbound calls in progress by upstream."),
+    "password_hash_duration_seconds": ("histogram", "bcrypt hash/verify latency including time queued for the pool."),
+    "password_hash_in_flight": ("gauge", "bcrypt jobs running or queued."),
+    "password_hash_rejected_total": ("counter", "bcrypt jobs refused because the pool was saturated."),
+}
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS metric_series (
+    pid INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (pid, name, labels)
+);
+CREATE TABLE IF NOT EXISTS metric_workers (
+    pid INTEGER PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+""")
+
+_lock = threading.Lock()
+_series = {}   # (name, labels) -> float, or [bucket counts..., sum, count] for histograms
+_dirty = set()
+_written = {}  # (name, labels) -> value this worker last wrote to metric_series
+_offsets = {}  # (name, labels) -> part of _series already folded into RETIRED_PID
+_thread_pid = None
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        _series[key] = _series.get(key, 0) + value
+        _dirty.add(key)
+
+
+def gauge_add(name: str, delta: float, **labels) -> None:
+    inc(name, delta, **labels)
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    key = (name, _labels(labels))
+    i = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        h = _series.get(key)
+        if h is None:
+            h = _series[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        if i < len(LATENCY_BUCKETS):
+            h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+        _dirty.add(key)
+
+
+@contextmanager
+def upstream(name: str, method: str):
+    # with metrics.upstream("pypi", "GET") as call: ...; call["outcome"] = "2xx"
+    call = {"outcome": "error"}
+    gauge_add("upstream_requests_in_flight", 1, upstream=name)
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        gauge_add("upstream_requests_in_flight", -1, upstream=name)
+        observe("upstream_request_duration_seconds", time.perf_counter() - started,
+                upstream=name, method=method, outcome=call["outcome"])
+
+
+def status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+def _kind(name: str) -> str:
+    return METRICS.get(name, ("gauge", ""))[0]
+
+
+def _add(a, b):
+    return [x + y for x, y in zip(a, b)] if isinstance(a, list) else a + b
+
+
+def _sub(a, b):
+    return [x - y for x, y in zip(a, b)] if isinstance(a, list) else a - b
+
+
+def flush() -> None:
+    pid = os.getpid()
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    changed = []
+    try:
+        # Rows this worker wrote are gone only if render() retired it after it
+        # missed METRICS_WORKER_TTL_SECONDS of flushes; what it had written now
+        # lives in the retired rows, so from here on write only the remainder
+        retired = bool(_written) and conn.execute(
+            "SELECT 1 FROM metric_workers WHERE pid = ?", (pid,)
+        ).fetchone() is None
+        with _lock:
+            if retired:
+                for key, value in _written.items():
+                    if _kind(key[0]) != "gauge":
+                        _offsets[key] = _add(_offsets[key], value) if key in _offsets else value
+                _written.clear()
+                _dirty.update(_series)
+            for key in _dirty:
+                value = _series[key]
+                if key in _offsets:
+                    value = _sub(value, _offsets[key])
+                changed.append((key, list(value) if isinstance(value, list) else value))
+            _dirty.clear()
+        conn.executemany(
+            "INSERT OR REPLACE INTO metric_series (pid, name, labels, value) VALUES (?, ?, ?, ?)",
+            [(pid, name, json.dumps(labels), json.dumps(value)) for (name, labels), value in changed],
+        )
+        conn.execute("INSERT OR REPLACE INTO metric_workers (pid, seen_at) VALUES (?, ?)", (pid, time.time()))
+        _written.update(changed)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        with _lock:
+            _dirty.update(key for key, _ in changed)
+        raise
+
+
+def _retire(conn, cutoff: float) -> None:
+    # Caller holds the write transaction
+    pids = [pid for (pid,) in conn.execute("SELECT pid FROM metric_workers WHERE seen_at < ?", (cutoff,))]
+    if not pids:
+        return
+    marks = ",".join("?" * len(pids))
+    folded = {}
+    for name, labels, value in conn.execute(
+        f"SELECT name, labels, value FROM metric_series WHERE pid IN ({marks})", pids
+    ):
+        if _kind(name) == "gauge":
+            continue
+        value = json.loads(value)
+        key = (name, labels)
+        folded[key] = _add(folded[key], value) if key in folded else value
+    for key in list(folded):
+        row = conn.execute(
+            "SELECT value FROM metric_series WHERE pid = ? AND name = ? AND labels = ?", (RETIRED_PID,) + key
+        ).fetchone()
+        if row is not None:
+            folded[key] = _add(json.loads(row[0]), folded[key])
+    conn.executemany(
+        "INSERT OR REPLACE INTO metric_series (pid, name, labels, value) VALUES (?, ?, ?, ?)",
+        [(RETIRED_PID, name, labels, json.dumps(value)) for (name, labels), value in folded.items()],
+    )
+    conn.execute(f"DELETE FROM metric_series WHERE pid IN ({marks})", pids)
+    conn.execute(f"DELETE FROM metric_workers WHERE pid IN ({marks})", pids)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            logging.warning("Metrics flush failed: %s", str(e))
+
+
+def ensure_flusher() -> None:
+    global _thread_pid
+    if _thread_pid == os.getpid():
+        return
+    with _lock:
+        if _thread_pid == os.getpid():
+            return
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+        _thread_pid = os.getpid()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(value) -> str:
+    # Exact, unlike :g which keeps 6 significant digits
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render() -> str:
+    # Text exposition format 0.0.4, summed over live and retired workers
+    flush()
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _retire(conn, time.time() - METRICS_WORKER_TTL_SECONDS)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    totals = {}
+    for name, labels, value in conn.execute("SELECT name, labels, value FROM metric_series"):
+        key = (name, tuple(tuple(p) for p in json.loads(labels)))
+        value = json.loads(value)
+        if isinstance(value, list):
+            prev = totals.get(key)
+            totals[key] = value if prev is None else [a + b for a, b in zip(prev, value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = sorted((labels, v) for (n, labels), v in totals.items() if n == name)
+        if not series:
+            continue
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{full}{_fmt_labels(labels)} {_fmt_value(value)}")
+                continue
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, value):
+                cumulative += n
+                lines.append(f"{full}_bucket{_fmt_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{full}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {value[-1]}")
+            lines.append(f"{full}_sum{_fmt_labels(labels)} {value[-2]:.6f}")
+            lines.append(f"{full}_count{_fmt_labels(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def install(app) -> None:
+    # Per-route request metrics; the route label is the URL rule, not the raw path
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = time.perf_counter()
+        gauge_add("http_requests_in_flight", 1)
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        method, status = request.method, response.status_code
+
+        def done():
+            gauge_add("http_requests_in_flight", -1)
+            inc("http_requests_total", method=method, route=route, status=status)
+            observe("http_request_duration_seconds", time.perf_counter() - started, method=method, route=route)
+        # Streamed bodies are timed until the server has sent them
+        response.call_on_close(done)
+        return response
+
+    @app.teardown_request
+    def _metrics_abort(exc):
+        # Only reached with metrics_started still set when after_request never ran
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            gauge_add("http_requests_in_flight", -1)
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            inc("http_requests_total", method=request.method, route=route, status=500)
+            observe("http_request_duration_seconds", time.perf_counter() - started, method=request.method, route=route)
+
+    ensure_flusher()
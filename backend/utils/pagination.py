@@ -0,0 +1,151 @@
+import os
+import json
+import base64
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import request, jsonify
+from requests.utils import quote
+
+from . import fastjson
+from . import supabase_client as sb
+from .supabase_client import quote_value
+
+# Keyset pagination over (created_at, id), newest first. A cursor encodes the
+# last row of the previous page, so each page is an index range scan in
+# PostgREST instead of an OFFSET that re-reads everything before it.
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "200"))
+# Rows per request when a rebuild reads a whole table; keep it at or below the
+# PostgREST max-rows setting (1000 on Supabase)
+PAGE_SIZE_FULL_FETCH = int(os.environ.get("PAGE_SIZE_FULL_FETCH", "1000"))
+
+ORDER = "order=created_at.desc,id.desc"
+_KEY_FIELDS = ("created_at", "id")
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(row_id, (int, str)):
+        raise ValueError("invalid cursor")
+    return created_at, row_id
+
+
+def quote_eq(value) -> str:
+    # Value for a plain eq./gte./lt. filter (no PostgREST double quoting needed)
+    return quote(str(value), safe="")
+
+
+def prefix_filter(column: str, prefix: str) -> str:
+    # Case-insensitive prefix match; LIKE wildcards in the input are matched literally
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "")
+    return f"{column}=ilike.{quote_eq(escaped)}*"
+
+
+def date_range_filters():
+    # ?created_after= / ?created_before= (ISO 8601) -> (filters, error_response)
+    filters = []
+    for arg, op in (("created_after", "gte"), ("created_before", "lt")):
+        raw = (request.args.get(arg) or "").strip()
+        if not raw:
+            continue
+        try:
+            datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        except ValueError:
+            return None, (jsonify({"error": f"{arg} must be an ISO 8601 date"}), 400)
+        filters.append(f"created_at={op}.{quote_eq(raw)}")
+    return filters, None
+
+
+def parse_page_args(allowed_fields):
+    # Reads ?limit=, ?cursor=, ?fields= and ?all=1 -> (page, error_response)
+    raw_fields = (request.args.get("fields") or "").strip()
+    if raw_fields:
+        fields = list(dict.fromkeys(f.strip() for f in raw_fields.split(",") if f.strip()))
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown or not fields:
+            return None, (jsonify({"error": f"unknown fields: {', '.join(unknown)}", "allowed": list(allowed_fields)}), 400)
+    else:
+        fields = list(allowed_fields)
+
+    unpaginated = request.args.get("all", "").lower() in ("1", "true", "yes")
+    try:
+        limit = int(request.args.get("limit") or PAGE_SIZE_DEFAULT)
+    except ValueError:
+        return None, (jsonify({"error": "limit must be an integer"}), 400)
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+
+    cursor = None
+    raw_cursor = (request.args.get("cursor") or "").strip()
+    if raw_cursor and not unpaginated:
+        try:
+            cursor = decode_cursor(raw_cursor)
+        except ValueError as e:
+            return None, (jsonify({"error": str(e)}), 400)
+
+    return {"fields": fields, "limit": limit, "cursor": cursor, "all": unpaginated}, None
+
+
+def page_query(page: dict) -> str:
+    # select/order/limit/cursor part of a PostgREST query; for pages the key columns
+    # are always selected so the next cursor can be built, and dropped in finish_page.
+    # ?all=1 selects exactly the requested fields, so its body needs no rewriting.
+    if page["all"]:
+        return f"select={','.join(page['fields'])}&{ORDER}"
+    select = list(page["fields"]) + [k for k in _KEY_FIELDS if k not in page["fields"]]
+    parts = [f"select={','.join(select)}", ORDER]
+    parts.append(f"limit={page['limit'] + 1}")
+    if page["cursor"]:
+        created_at, row_id = page["cursor"]
+        ts, rid = quote_value(created_at), quote_value(row_id)
+        parts.append(f"or=(created_at.lt.{ts},and(created_at.eq.{ts},id.lt.{rid}))")
+    return "&".join(parts)
+
+
+def finish_page(rows: list, page: dict):
+    # -> (rows, next_cursor); one extra row was fetched to detect a further page
+    if page["all"]:
+        return rows, None
+    next_cursor = None
+    if len(rows) > page["limit"]:
+        rows = rows[:page["limit"]]
+        next_cursor = encode_cursor(rows[-1])
+    extra = [k for k in _KEY_FIELDS if k not in page["fields"]]
+    if extra:
+        rows = [{k: v for k, v in row.items() if k not in extra} for row in rows]
+    return rows, next_cursor
+
+
+def next_link(next_cursor: str) -> str:
+    args = request.args.to_dict()
+    args["cursor"] = next_cursor
+    return f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+
+
+def fetch_all_rows(table: str, fields, timeout: float = None) -> list:
+    # Every row of a table, read in keyset pages so PostgREST's max-rows cap
+    # cannot silently truncate it. The cap may also shorten a page, so only an
+    # empty page ends the walk. Raises if any page fails: callers rebuilding
+    # state from the result must not swap in a partial snapshot.
+    page = {"fields": list(fields), "limit": PAGE_SIZE_FULL_FETCH, "cursor": None, "all": False}
+    rows = []
+    while True:
+        r = sb.get(f"{table}?{page_query(page)}", timeout=timeout)
+        if r.status_code != 200:
+            raise RuntimeError(f"{table} fetch failed after {len(rows)} rows: {r.status_code} {r.text}")
+        batch = fastjson.loads(r.content)
+        if not batch:
+            return rows
+        last = batch[-1]
+        page["cursor"] = (last["created_at"], last["id"])
+        extra = [k for k in _KEY_FIELDS if k not in page["fields"]]
+        rows.extend([{k: v for k, v in row.items() if k not in extra} for row in batch] if extra else batch)
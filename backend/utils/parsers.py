@@ -1,5 +1,8 @@
 import re
 
+# Bump whenever parsing output changes so cached scan results are not reused
+PARSER_VERSION = "1"
+
 
 def parse_requirements_txt(text: str):
     results = []
@@ -39,3 +42,31 @@ def parse_pyproject_toml(content: bytes):
         if m:
             items.append({"name": m.group(1), "spec": (m.group(2) or "").strip()})
     return items
+
+
+def parse_manifest(filename: str, content: bytes):
+    # Raises ValueError with a client-facing message for unsupported/invalid files
+    if filename.endswith(".txt"):
+        try:
+            return parse_requirements_txt(content.decode("utf-8", errors="ignore"))
+        except Exception:
+            raise ValueError("failed to parse requirements.txt")
+    if filename.endswith(".toml"):
+        try:
+            return parse_pyproject_toml(content)
+        except Exception:
+            raise ValueError("failed to parse pyproject.toml (install tomli for Python 3.10)")
+    raise ValueError("Only requirements.txt or pyproject.toml are supported")
+
+
+def unique_packages(items):
+    # Deduplicate by case-insensitive package name; keep first occurrence/spec
+    unique = {}
+    for it in items:
+        name = (it.get("name") or "").strip()
+        if not name:
+            continue
+        key = name.lower()
+        if key not in unique:
+            unique[key] = {"name": name, "spec": it.get("spec", "")}
+    return list(unique.values())
@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import bcrypt
+
+from . import metrics, tracing
+
+# bcrypt runs on a small per-worker thread pool instead of the request thread.
+# bcrypt releases the GIL while hashing, so the pool bounds how many CPU-heavy
+# hashes a worker runs at once while gthread request threads keep serving other
+# routes. At most PASSWORD_HASH_WORKERS run and PASSWORD_HASH_QUEUE more wait;
+# beyond that callers get PasswordHasherBusy straight away (503 via create_app)
+# instead of queueing behind a login burst.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", "16"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+_LATENCY_SAMPLES = 1000
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_counters = {"hashes": 0, "verifies": 0, "rehashes": 0, "rejected": 0, "timeouts": 0}
+_latencies = {"hash": deque(maxlen=_LATENCY_SAMPLES), "verify": deque(maxlen=_LATENCY_SAMPLES), "login": deque(maxlen=_LATENCY_SAMPLES)}
+
+
+class PasswordHasherBusy(Exception):
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("password hashing pool saturated")
+        self.retry_after = retry_after
+
+
+def _get_pool():
+    global _pool, _pool_pid, _slots
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+                _slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+                _pool_pid = pid
+    return _pool, _slots
+
+
+def _observe(kind: str, seconds: float) -> None:
+    with _stats_lock:
+        _latencies[kind].append(seconds)
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _counters[name] += 1
+
+
+def _submit(fn, *args):
+    # Returns a future; raises PasswordHasherBusy when running + queued jobs are at the cap
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        _count("rejected")
+        metrics.inc("password_hash_rejected_total")
+        raise PasswordHasherBusy()
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    metrics.gauge_add("password_hash_in_flight", 1)
+
+    def done(_):
+        slots.release()
+        metrics.gauge_add("password_hash_in_flight", -1)
+    future.add_done_callback(done)
+    return future
+
+
+def _run(kind: str, counter: str, fn, *args):
+    with tracing.span(f"bcrypt.{kind}", category="auth"):
+        return _run_timed(kind, counter, fn, *args)
+
+
+def _run_timed(kind: str, counter: str, fn, *args):
+    started = time.perf_counter()
+    future = _submit(fn, *args)
+    _count(counter)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+    except FuturesTimeout:
+        _count("timeouts")
+        raise PasswordHasherBusy()
+    finally:
+        elapsed = time.perf_counter() - started
+        _observe(kind, elapsed)
+        metrics.observe("password_hash_duration_seconds", elapsed, op=kind)
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def hash_password(password: str) -> str:
+    return _run("hash", "hashes", _hash, password)
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    # False for a malformed stored hash as well as a wrong password
+    def check():
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+        except ValueError:
+            return False
+    return _run("verify", "verifies", check)
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    # "$2b$<cost>$..." hashed with fewer rounds than currently configured
+    try:
+        return int(stored_hash.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def rehash_later(password: str, save) -> None:
+    # Upgrades a hash after a successful login without delaying the response:
+    # hashes on the pool, then save(new_hash) on the same pool thread. Skipped
+    # when the pool is saturated; the next login tries again.
+    def job():
+        try:
+            save(_hash(password))
+            _count("rehashes")
+        except Exception as e:
+            logging.warning("Password rehash failed: %s", str(e))
+    try:
+        _submit(job)
+    except PasswordHasherBusy:
+        pass
+
+
+def observe_login(seconds: float) -> None:
+    _observe("login", seconds)
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(samples)
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+    return {"count": len(ordered), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def stats() -> dict:
+    # Latencies are over the last _LATENCY_SAMPLES operations of this worker;
+    # hash/verify include time queued for the pool
+    with _stats_lock:
+        samples = {kind: list(values) for kind, values in _latencies.items()}
+        counters = dict(_counters)
+    return {
+        **counters,
+        "rounds": BCRYPT_ROUNDS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue": PASSWORD_HASH_QUEUE,
+        "latency": {kind: _percentiles(values) for kind, values in samples.items()},
+    }
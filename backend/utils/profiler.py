@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# On-demand statistical profiler for one worker. Nothing is hooked into request
+# handling: while a session runs, the thread that asked for it wakes every
+# interval, reads sys._current_frames() and counts each thread's stack. When no
+# session runs there is no sampler, no hook and no per-request bookkeeping.
+#
+# A sampled thread is attributed to a request by looking for Flask's request
+# context in its own frames (the ctx local of Flask.wsgi_app, or of the
+# stream_with_context wrapper), so requests that started before the session
+# are labelled too. Output is the collapsed-stack format ("a;b;c 42") read by
+# flamegraph.pl, speedscope and inferno; the first frame of each stack is the
+# route ("GET /releases/<release_id>") or the thread name.
+PROFILE_DEFAULT_SECONDS = float(os.environ.get("PROFILE_DEFAULT_SECONDS", "10"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "10"))
+PROFILE_MAX_DEPTH = int(os.environ.get("PROFILE_MAX_DEPTH", "128"))
+MIN_INTERVAL_MS = 1.0
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+_CONTEXT_FRAMES = {"wsgi_app": "ctx", "generator": "req_ctx"}
+
+_lock = threading.Lock()
+_running = False
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_ROOT):
+        return filename[len(_ROOT):]
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker != -1:
+        return filename[marker + len("site-packages") + 1:]
+    return os.path.basename(filename)
+
+
+def _route_of(frame):
+    # Returns "METHOD rule" when frame is the Flask frame holding the request
+    # context, else None
+    code = frame.f_code
+    local = _CONTEXT_FRAMES.get(code.co_name)
+    if local is None or "flask" not in code.co_filename:
+        return None
+    ctx = frame.f_locals.get(local)
+    req = getattr(ctx, "request", None)
+    if req is None:
+        return None
+    rule = req.url_rule.rule if req.url_rule is not None else "unmatched"
+    return f"{req.method} {rule}"
+
+
+def _sample(frame, labels: dict):
+    # Root-first frame labels plus the route found on the way up
+    names, route = [], None
+    while frame is not None:
+        code = frame.f_code
+        name = labels.get(code)
+        if name is None:
+            name = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        names.append(name)
+        if route is None:
+            route = _route_of(frame)
+        frame = frame.f_back
+    names.reverse()
+    if len(names) > PROFILE_MAX_DEPTH:
+        names = names[:PROFILE_MAX_DEPTH // 2] + ["[truncated]"] + names[-PROFILE_MAX_DEPTH // 2:]
+    return route, names
+
+
+def _matches(thread_route, route: str) -> bool:
+    # route is a URL rule ("/releases/<release_id>"), optionally with a method
+    if thread_route is None:
+        return False
+    return thread_route == route if " " in route else thread_route.split(" ", 1)[1] == route
+
+
+def profile(seconds: float, interval_ms: float, route: str = None, all_threads: bool = False):
+    # Blocks the calling thread for `seconds`. Only request threads are kept
+    # unless all_threads; `route` keeps only threads serving that URL rule.
+    # Returns (collapsed text, meta dict); raises ProfilerBusy if a session is
+    # already running in this worker.
+    global _running
+    with _lock:
+        if _running:
+            raise ProfilerBusy()
+        _running = True
+    try:
+        return _profile(seconds, interval_ms, route, all_threads)
+    finally:
+        with _lock:
+            _running = False
+
+
+def _profile(seconds: float, interval_ms: float, route, all_threads: bool):
+    interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+    me = threading.get_ident()
+    labels, stacks = {}, Counter()
+    samples = matched = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    next_at = started
+    while True:
+        names = {t.ident: t.name for t in threading.enumerate()} if all_threads else None
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread_route, stack = _sample(frame, labels)
+            if route is not None and not _matches(thread_route, route):
+                continue
+            if thread_route is None and not all_threads:
+                continue
+            stacks[";".join([thread_route or names.get(ident, f"thread-{ident}")] + stack)] += 1
+            matched += 1
+        samples += 1
+        next_at += interval
+        now = time.perf_counter()
+        if next_at >= deadline:
+            break
+        if next_at > now:
+            time.sleep(next_at - now)
+        else:
+            # Fell behind (GIL contention); skip missed ticks rather than burst
+            next_at = now
+    elapsed = time.perf_counter() - started
+    text = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    meta = {
+        "pid": os.getpid(),
+        "samples": samples,
+        "stacks": matched,
+        "seconds": round(elapsed, 3),
+        "interval_ms": round(interval * 1000, 3),
+    }
+    return (text + "\n") if text else "", meta
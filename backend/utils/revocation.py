@@ -0,0 +1,189 @@
+import os
+import time
+import math
+import hashlib
+import logging
+import threading
+
+from .local_store import get_conn, register_schema
+from .supabase import JWT_EXP_SECONDS
+
+# Token revocation without a Supabase read per request. The exact denylist
+# lives in the shared SQLite store:
+#   "jti:<jti>"   one token (logout), until that token's exp
+#   "user:<id>"   every token of a user issued at or before revoked_at (delete,
+#                 role change), until the longest-lived such token has expired
+# Each worker keeps a Bloom filter of the keys, topped up from the table at most
+# every REVOCATION_SYNC_SECONDS. A request costs one digest and a few bit tests;
+# only a Bloom hit (a revoked token, or a rare false positive) reads SQLite.
+# Expired rows are pruned and the filter rebuilt every REVOCATION_PRUNE_SECONDS.
+REVOCATION_SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", "1"))
+REVOCATION_PRUNE_SECONDS = float(os.environ.get("REVOCATION_PRUNE_SECONDS", "300"))
+REVOCATION_BLOOM_BITS = int(os.environ.get("REVOCATION_BLOOM_BITS", str(1 << 23)))
+_BLOOM_HASHES = 7
+
+register_schema("""
+CREATE TABLE IF NOT EXISTS revocations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    revoked_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS revocations_expiry ON revocations (expires_at);
+""")
+
+
+class _Bloom:
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from one 128-bit digest, generated lazily so
+        # a miss usually stops after the first probe or two
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+        for i in range(_BLOOM_HASHES):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        array = self.array
+        for p in self._positions(key):
+            if not array[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def false_positive_rate(self) -> float:
+        return (1 - math.exp(-_BLOOM_HASHES * self.count / self.bits)) ** _BLOOM_HASHES
+
+
+_lock = threading.Lock()
+_pid = None
+_bloom = None
+_seq = 0
+_synced_at = 0.0
+_pruned_at = 0.0
+_counters = {"checks": 0, "bloom_hits": 0, "revoked": 0, "cleared": 0, "syncs": 0, "prunes": 0}
+
+
+def _reset() -> None:
+    global _pid, _bloom, _seq, _synced_at, _pruned_at
+    _pid, _bloom, _seq = os.getpid(), _Bloom(REVOCATION_BLOOM_BITS), 0
+    _synced_at = _pruned_at = time.monotonic()
+    _sync()
+
+
+def _sync() -> None:
+    global _seq, _synced_at
+    for seq, key in get_conn().execute(
+        "SELECT seq, key FROM revocations WHERE seq > ? ORDER BY seq", (_seq,)
+    ):
+        _bloom.add(key)
+        _seq = seq
+    _synced_at = time.monotonic()
+    _counters["syncs"] += 1
+
+
+def _prune() -> None:
+    # Any worker may delete expired rows; each rebuilds its own filter without them
+    global _bloom, _seq, _pruned_at
+    conn = get_conn()
+    conn.execute("DELETE FROM revocations WHERE expires_at < ?", (time.time(),))
+    _bloom, _seq = _Bloom(REVOCATION_BLOOM_BITS), 0
+    _sync()
+    _pruned_at = time.monotonic()
+    _counters["prunes"] += 1
+
+
+def _refresh() -> None:
+    now = time.monotonic()
+    if _pid != os.getpid():
+        _reset()
+    elif now - _pruned_at >= REVOCATION_PRUNE_SECONDS:
+        _prune()
+    elif now - _synced_at >= REVOCATION_SYNC_SECONDS:
+        _sync()
+
+
+def _revoke(key: str, revoked_at: float, expires_at: float) -> bool:
+    try:
+        get_conn().execute(
+            "INSERT INTO revocations (key, revoked_at, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET revoked_at = excluded.revoked_at, "
+            "expires_at = MAX(expires_at, excluded.expires_at)",
+            (key, revoked_at, expires_at),
+        )
+        with _lock:
+            if _pid != os.getpid():
+                _reset()
+            _bloom.add(key)
+    except Exception as e:
+        logging.error("Revocation of %s failed: %s", key, str(e))
+        return False
+    return True
+
+
+def revoke_token(claims: dict) -> bool:
+    # Tokens without a jti (issued before jti claims existed) cannot be revoked singly
+    jti = claims.get("jti")
+    if not jti:
+        return False
+    return _revoke(f"jti:{jti}", time.time(), float(claims.get("exp") or time.time() + JWT_EXP_SECONDS))
+
+
+def revoke_user(user_id) -> bool:
+    # iat has one-second resolution, so a token issued in the same second is revoked too
+    now = time.time()
+    return _revoke(f"user:{user_id}", math.floor(now), now + JWT_EXP_SECONDS)
+
+
+def is_revoked(claims: dict) -> bool:
+    keys = [f"user:{claims.get('user_id')}"]
+    if claims.get("jti"):
+        keys.append(f"jti:{claims['jti']}")
+    with _lock:
+        try:
+            _refresh()
+        except Exception as e:
+            logging.warning("Revocation sync failed: %s", str(e))
+        _counters["checks"] += 1
+        suspects = [k for k in keys if _bloom is not None and k in _bloom]
+        if not suspects:
+            return False
+        _counters["bloom_hits"] += 1
+    revoked = False
+    try:
+        conn = get_conn()
+        for key in suspects:
+            row = conn.execute(
+                "SELECT revoked_at, expires_at FROM revocations WHERE key = ?", (key,)
+            ).fetchone()
+            if not row or row[1] < time.time():
+                continue
+            if key.startswith("jti:") or (claims.get("iat") or 0) <= row[0]:
+                revoked = True
+                break
+    except Exception as e:
+        # Fail closed: a token the filter flags is refused while the store is unreadable
+        logging.error("Revocation lookup failed: %s", str(e))
+        revoked = True
+    with _lock:
+        _counters["revoked" if revoked else "cleared"] += 1
+    return revoked
+
+
+def stats() -> dict:
+    with _lock:
+        bloom = _bloom if _pid == os.getpid() else None
+        return {
+            **_counters,
+            "bloom_keys": bloom.count if bloom else 0,
+            "bloom_bytes": len(bloom.array) if bloom else 0,
+            "bloom_false_positive_rate": round(bloom.false_positive_rate(), 6) if bloom else None,
+        }
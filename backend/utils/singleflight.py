@@ -0,0 +1,52 @@
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Concurrent callers with the same key share one execution of fn: the first
+    # caller runs it, the rest wait and get the same result or exception.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn, timeout: float = None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"timed out waiting for in-flight call {key!r}")
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executions": self.executions, "deduplicated": self.deduplicated, "in_flight": len(self._calls)}
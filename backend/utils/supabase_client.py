@@ -0,0 +1,244 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait, FIRST_COMPLETED
+
+import requests
+from flask import Response, g, has_request_context
+from requests.adapters import HTTPAdapter
+
+from .supabase import REST_BASE, HEADERS
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from . import metrics, tracing
+
+# Shared keep-alive client for PostgREST so handlers reuse TCP+TLS connections
+# instead of paying a handshake per call. Paths are relative to REST_BASE,
+# e.g. get(f"{RELEASES_TABLE}?id=eq.1"); HEADERS are always sent.
+SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "10"))
+SUPABASE_TIMEOUT_SECONDS = float(os.environ.get("SUPABASE_TIMEOUT_SECONDS", "8"))
+
+# Resilience: retries for idempotent reads, a per-worker circuit breaker, a
+# per-inbound-request budget shared by all its upstream calls, and optional
+# hedged reads (disabled unless SUPABASE_HEDGE_AFTER_SECONDS > 0).
+SUPABASE_RETRIES = int(os.environ.get("SUPABASE_RETRIES", "2"))
+SUPABASE_BACKOFF_BASE_SECONDS = float(os.environ.get("SUPABASE_BACKOFF_BASE_SECONDS", "0.1"))
+SUPABASE_BACKOFF_MAX_SECONDS = float(os.environ.get("SUPABASE_BACKOFF_MAX_SECONDS", "1"))
+SUPABASE_BREAKER_THRESHOLD = int(os.environ.get("SUPABASE_BREAKER_THRESHOLD", "5"))
+SUPABASE_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("SUPABASE_BREAKER_COOLDOWN_SECONDS", "15"))
+SUPABASE_REQUEST_BUDGET_SECONDS = float(os.environ.get("SUPABASE_REQUEST_BUDGET_SECONDS", "10"))
+SUPABASE_HEDGE_AFTER_SECONDS = float(os.environ.get("SUPABASE_HEDGE_AFTER_SECONDS", "0"))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_hedge_pool = None
+_hedge_pool_pid = None
+_breaker = CircuitBreaker(SUPABASE_BREAKER_THRESHOLD, SUPABASE_BREAKER_COOLDOWN_SECONDS)
+_stats_lock = threading.Lock()
+_counters = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "budget_exhausted": 0}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _counters[name] += 1
+
+
+def _get_session() -> requests.Session:
+    # Sockets must not be shared across a gunicorn fork, so each process builds its own
+    # pool. Within a process the urllib3 pool is thread-safe for gthread workers.
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                s = requests.Session()
+                s.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SUPABASE_POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session, _session_pid = s, pid
+    return _session
+
+
+class SupabaseUnavailable(Exception):
+    # Raised without calling Supabase when the breaker is open or the request's
+    # upstream budget is spent; create_app turns it into a 503
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _remaining_budget():
+    # Seconds left for upstream calls in this inbound request (None outside one).
+    # The clock starts at the first Supabase call the request makes.
+    if not has_request_context():
+        return None
+    deadline = g.get("supabase_deadline")
+    if deadline is None:
+        deadline = g.supabase_deadline = time.monotonic() + SUPABASE_REQUEST_BUDGET_SECONDS
+    return deadline - time.monotonic()
+
+
+def _send(method, url, data, headers, timeout, stream):
+    # One attempt; streamed responses are timed to their headers
+    with metrics.upstream("supabase", method) as call, tracing.span("supabase.attempt") as span:
+        r = _get_session().request(method, url, data=data, headers=headers, timeout=timeout, stream=stream)
+        call["outcome"] = metrics.status_class(r.status_code)
+        span["status"] = r.status_code
+        return r
+
+
+def _close_loser(future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _hedged_get(url, headers, timeout):
+    # Sends a duplicate GET if the first has not answered within
+    # SUPABASE_HEDGE_AFTER_SECONDS and returns whichever succeeds first
+    global _hedge_pool, _hedge_pool_pid
+    if _hedge_pool is None or _hedge_pool_pid != os.getpid():
+        with _session_lock:
+            if _hedge_pool is None or _hedge_pool_pid != os.getpid():
+                _hedge_pool = ThreadPoolExecutor(max_workers=SUPABASE_POOL_SIZE, thread_name_prefix="supabase-hedge")
+                _hedge_pool_pid = os.getpid()
+    first = _hedge_pool.submit(tracing.wrap(_send), "GET", url, None, headers, timeout, False)
+    try:
+        return first.result(timeout=SUPABASE_HEDGE_AFTER_SECONDS)
+    except FuturesTimeout:
+        pass
+    _count("hedges")
+    second = _hedge_pool.submit(tracing.wrap(_send), "GET", url, None, headers, timeout, False)
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                for other in pending:
+                    other.add_done_callback(_close_loser)
+                if f is second:
+                    _count("hedge_wins")
+                return f.result()
+            error = f.exception()
+    raise error
+
+
+def request(method: str, path: str, data=None, headers: dict = None, timeout: float = None, stream: bool = False) -> requests.Response:
+    # Traced as one span (attempts and backoff nested); only the table goes in
+    # the span, since query strings can carry emails
+    with tracing.span("supabase.request", category="supabase", method=method, table=path.split("?", 1)[0]) as span:
+        r = _request(method, path, data, headers, timeout, stream)
+        span["status"] = r.status_code
+        return r
+
+
+def _request(method, path, data, headers, timeout, stream) -> requests.Response:
+    # GETs are retried on connection errors and 5xx/429 with full-jitter backoff;
+    # writes are sent once. Every attempt goes through the breaker and is capped
+    # by what is left of the request budget.
+    url = path if path.startswith(("http://", "https://")) else f"{REST_BASE}/{path}"
+    attempts = 1 + (SUPABASE_RETRIES if method == "GET" else 0)
+    for attempt in range(attempts):
+        remaining = _remaining_budget()
+        if remaining is not None and remaining <= 0:
+            _count("budget_exhausted")
+            raise SupabaseUnavailable("upstream time budget exhausted")
+        call_timeout = timeout or SUPABASE_TIMEOUT_SECONDS
+        if remaining is not None:
+            call_timeout = min(call_timeout, remaining)
+        try:
+            _breaker.before_call()
+        except CircuitOpenError as e:
+            raise SupabaseUnavailable("Supabase circuit open", retry_after=e.retry_after)
+
+        _count("calls")
+        try:
+            if method == "GET" and not stream and SUPABASE_HEDGE_AFTER_SECONDS > 0:
+                r = _hedged_get(url, headers, call_timeout)
+            else:
+                r = _send(method, url, data, headers, call_timeout, stream)
+        except requests.RequestException:
+            _breaker.record(False)
+            _count("failures")
+            if attempt + 1 >= attempts or not _backoff(attempt):
+                raise
+            continue
+        except BaseException:
+            # Not retried, but the breaker must still hear back or a half-open
+            # probe would stay in flight and reject every later call
+            _breaker.record(False)
+            _count("failures")
+            raise
+
+        if r.status_code < 500 and r.status_code != 429:
+            _breaker.record(True)
+            return r
+        _breaker.record(False)
+        _count("failures")
+        if attempt + 1 >= attempts or not _backoff(attempt):
+            return r
+        r.content  # drain the (small) error body so the connection goes back to the pool
+        r.close()
+    return r
+
+
+def _backoff(attempt: int) -> bool:
+    # Sleeps before a retry; False if the request budget cannot cover it
+    delay = random.uniform(0, min(SUPABASE_BACKOFF_MAX_SECONDS, SUPABASE_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    remaining = _remaining_budget()
+    if remaining is not None and remaining <= delay:
+        return False
+    _count("retries")
+    time.sleep(delay)
+    return True
+
+
+def stats() -> dict:
+    with _stats_lock:
+        counters = dict(_counters)
+    return {**counters, "breaker": _breaker.stats()}
+
+
+def get(path: str, **kwargs) -> requests.Response:
+    return request("GET", path, **kwargs)
+
+
+def post(path: str, **kwargs) -> requests.Response:
+    return request("POST", path, **kwargs)
+
+
+def patch(path: str, **kwargs) -> requests.Response:
+    return request("PATCH", path, **kwargs)
+
+
+def delete(path: str, **kwargs) -> requests.Response:
+    return request("DELETE", path, **kwargs)
+
+
+def quote_value(value) -> str:
+    # PostgREST literal for or=/in. filters: double-quoted so commas, dots and
+    # parentheses in the value are not read as filter syntax, then URL-encoded
+    s = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return requests.utils.quote(f'"{s}"', safe="")
+
+
+_PASSTHROUGH_CHUNK_BYTES = 64 * 1024
+
+
+def passthrough(r: requests.Response, prefix: bytes = b"", suffix: bytes = b"") -> Response:
+    # Streams a stream=True PostgREST body to the client as-is (optionally wrapped,
+    # e.g. into {"users": ...}) instead of decoding and re-encoding it; the pooled
+    # connection is released once the body is drained or the client goes away
+    def body():
+        try:
+            if prefix:
+                yield prefix
+            for chunk in r.iter_content(chunk_size=_PASSTHROUGH_CHUNK_BYTES):
+                yield chunk
+            if suffix:
+                yield suffix
+        finally:
+            r.close()
+
+    return Response(body(), mimetype="application/json")
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from flask import request, g
+from flask_compress import Compress
+
+# In-process request tracing. Each request gets a trace; span() records named,
+# nested timings (parent = the span open in the current context) and adds them
+# to a per-category total that becomes the Server-Timing header. Pool threads
+# only see the trace when the submitted function goes through wrap(), which
+# copies the caller's context. Spans opened outside a request are no-ops.
+#
+# A trace is finished when the response is closed, so streamed bodies (the
+# NDJSON scan) are included. Traces slower than TRACE_SLOW_MS are logged as one
+# JSON line; TRACE_SAMPLE_RATE of all traces (and every slow one) are appended
+# to TRACE_EXPORT_PATH when it is set.
+TRACE_SLOW_MS = float(os.environ.get("TRACE_SLOW_MS", "1000"))
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "500"))
+# Server-Timing entries, in header order; "app" is what the others leave over
+CATEGORIES = ("auth", "supabase", "pypi", "serialize", "compress")
+
+_trace = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("span_parent", default=None)
+_export_lock = threading.Lock()
+
+
+class _Trace:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method, self.path = method, path
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.dropped = 0
+        self.totals = {}  # category -> [(start, end), ...] perf_counter intervals
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def add(self, span: dict, category, started: float, ended: float) -> None:
+        with self.lock:
+            if self.finished:
+                return
+            if category:
+                self.totals.setdefault(category, []).append((started, ended))
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+@contextmanager
+def span(name: str, category: str = None, **attrs):
+    # with tracing.span("supabase.request", category="supabase", method="GET") as s: s["status"] = 200
+    trace = _trace.get()
+    if trace is None:
+        yield {}
+        return
+    span_id = uuid.uuid4().hex[:8]
+    data = {"id": span_id, "parent": _parent.get(), "name": name, **attrs}
+    token = _parent.set(span_id)
+    started = time.perf_counter()
+    try:
+        yield data
+    except BaseException as e:
+        data["error"] = type(e).__name__
+        raise
+    finally:
+        ended = time.perf_counter()
+        _parent.reset(token)
+        data["start_ms"] = round((started - trace.started) * 1000, 3)
+        data["duration_ms"] = round((ended - started) * 1000, 3)
+        trace.add(data, category, started, ended)
+
+
+def wrap(fn):
+    # For executor.submit(tracing.wrap(fn), ...): runs fn inside a copy of the
+    # submitting thread's context so its spans join the request trace
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def _covered(intervals) -> float:
+    # Wall time covered by possibly overlapping intervals (parallel PyPI lookups
+    # count once, not once per thread)
+    covered, reach = 0.0, None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            covered += end - start
+            reach = end
+        elif end > reach:
+            covered += end - reach
+            reach = end
+    return covered
+
+
+def _category_ms(trace: _Trace) -> dict:
+    with trace.lock:
+        totals = {k: list(v) for k, v in trace.totals.items()}
+    return {k: (_covered(v) * 1000, len(v)) for k, v in totals.items()}
+
+
+def _server_timing(trace: _Trace) -> str:
+    total = (time.perf_counter() - trace.started) * 1000
+    parts, accounted = [], 0.0
+    categories = _category_ms(trace)
+    for category in CATEGORIES:
+        if category in categories:
+            ms, calls = categories[category]
+            accounted += ms
+            desc = f';desc="{calls} calls"' if calls > 1 else ""
+            parts.append(f"{category};dur={ms:.1f}{desc}")
+    parts.append(f"app;dur={max(total - accounted, 0):.1f}")
+    parts.append(f"total;dur={total:.1f}")
+    return ", ".join(parts)
+
+
+def _export(record: dict) -> None:
+    if not TRACE_EXPORT_PATH:
+        return
+    line = json.dumps(record, separators=(",", ":")) + "\n"
+    try:
+        with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as fh:
+            fh.write(line)
+    except OSError as e:
+        logging.warning("Trace export failed: %s", str(e))
+
+
+def _finish(trace: _Trace, status: int) -> None:
+    duration_ms = (time.perf_counter() - trace.started) * 1000
+    categories = _category_ms(trace)
+    with trace.lock:
+        if trace.finished:
+            return
+        trace.finished = True
+        record = {
+            "trace_id": trace.id,
+            "method": trace.method,
+            "path": trace.path,
+            "status": status,
+            "started_at": trace.started_at,
+            "duration_ms": round(duration_ms, 3),
+            "totals_ms": {k: round(ms, 3) for k, (ms, _) in categories.items()},
+            "spans": sorted(trace.spans, key=lambda s: s["start_ms"]),
+            "dropped_spans": trace.dropped,
+        }
+    slow = duration_ms >= TRACE_SLOW_MS
+    if slow:
+        logging.warning("slow request %s", json.dumps(record, separators=(",", ":")))
+    if slow or random.random() < TRACE_SAMPLE_RATE:
+        _export(record)
+
+
+class TracedCompress(Compress):
+    # flask-compress registers this bound method as its after_request hook, so
+    # overriding it times the compression of buffered responses
+    def after_request(self, response):
+        with span("compress", category="compress"):
+            return super().after_request(response)
+
+
+def install(app) -> None:
+    # Call before the compressor is registered: after_request hooks run in
+    # reverse order, so the header set here is written after compression ran
+    @app.before_request
+    def _trace_start():
+        trace = _Trace(request.method, request.path)
+        g.trace = trace
+        _trace.set(trace)
+        _parent.set(None)
+
+    @app.after_request
+    def _trace_headers(response):
+        trace = g.get("trace")
+        if trace is None:
+            return response
+        response.headers["Server-Timing"] = _server_timing(trace)
+        response.headers["X-Trace-Id"] = trace.id
+        status = response.status_code
+        response.call_on_close(lambda: _finish(trace, status))
+        return response
+
+    @app.teardown_request
+    def _trace_abort(exc):
+        # Covers requests whose response never reaches after_request
+        trace = g.get("trace")
+        if exc is not None and trace is not None:
+            _finish(trace, 500)
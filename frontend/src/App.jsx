@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback } from "react";
 import { LogOut, Zap, LayoutDashboard, Shield } from 'lucide-react';
-import { me } from "./lib/api";
+import { me, logout } from "./lib/api";
 import FullScreenLoader from "./components/FullScreenLoader";
 import AuthPage from "./pages/AuthPage";
 import TrackerPage from "./pages/TrackerPage";
@@ -49,6 +49,8 @@ import AdminPage from "./pages/AdminPage";
       };
     
       const handleLogout = () => {
+        // Revoke server-side too; the local session ends either way
+        if (token) logout(token);
         localStorage.removeItem("token");
         setToken("");
         setUser(null);
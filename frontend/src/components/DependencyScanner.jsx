@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from "react";
 import { Loader2, Upload, Plus } from "lucide-react";
-import { scanFile, importScanResults } from "../lib/api";
+import { scanFileStream, importScanResults } from "../lib/api";
 
 export default function DependencyScanner({ token, onImported }) {
   const [file, setFile] = useState(null);
@@ -10,20 +10,34 @@ export default function DependencyScanner({ token, onImported }) {
   const [error, setError] = useState("");
   const [hasScanned, setHasScanned] = useState(false);
 
+  const [isScanning, setIsScanning] = useState(false);
+
   const handleScan = async () => {
     if (!file) { setError("Please select a file to scan."); return; }
-    setIsLoading(true); setError(""); setResults([]); setSelected({}); setHasScanned(false);
+    setIsLoading(true); setIsScanning(true); setError(""); setResults([]); setSelected({}); setHasScanned(false);
+    // Rows arrive in completion order; slot them by manifest index to keep the file's order
+    const rows = [];
     try {
-      const data = await scanFile(token, file);
-      if (Array.isArray(data)) setResults(data); else setError(data?.error || "Failed to scan file.");
+      const data = await scanFileStream(token, file, (index, row) => {
+        rows[index] = row;
+        setResults(rows.filter(Boolean));
+      });
+      if (data?.error) setError(data.error);
     } catch (e) { setError(e.message); }
-    finally { setIsLoading(false); setHasScanned(true); }
+    finally { setIsLoading(false); setIsScanning(false); setHasScanned(true); }
+  };
+
+  const diffStyles = {
+    added: "bg-green-100 text-green-800",
+    changed: "bg-yellow-100 text-yellow-800",
+    removed: "bg-red-100 text-red-800",
   };
+  const selectable = results.filter(r => r.diff !== "removed");
 
   const toggle = (name) => setSelected(s => ({ ...s, [name]: !s[name] }));
 
   const handleImport = async () => {
-    const rows = results.filter(r => selected[r.name]);
+    const rows = selectable.filter(r => selected[r.name]);
     if (rows.length === 0) { setError("Select at least one row to import."); return; }
     setIsLoading(true); setError("");
     try {
@@ -34,14 +48,14 @@ export default function DependencyScanner({ token, onImported }) {
   };
 
   const selectedCount = Object.values(selected).filter(Boolean).length;
-  const allSelected = results.length > 0 && selectedCount === results.length;
+  const allSelected = selectable.length > 0 && selectedCount === selectable.length;
   const someSelected = selectedCount > 0 && !allSelected;
   const headerCheckboxRef = useRef(null);
   useEffect(() => { if (headerCheckboxRef.current) headerCheckboxRef.current.indeterminate = someSelected; }, [someSelected]);
   const handleSelectAll = (checked) => {
     if (checked) {
       const all = {};
-      results.forEach(r => { all[r.name] = true; });
+      selectable.forEach(r => { all[r.name] = true; });
       setSelected(all);
     } else {
       setSelected({});
@@ -71,16 +85,17 @@ export default function DependencyScanner({ token, onImported }) {
         </div>
       </div>
 
-      {isLoading && (
+      {isLoading && results.length === 0 && (
         <div className="flex justify-center items-center h-32">
           <Loader2 className="animate-spin h-8 w-8 text-indigo-600" />
         </div>
       )}
 
-      {hasScanned && !isLoading && (
+      {(hasScanned || results.length > 0) && (
         <div className="bg-white shadow-lg rounded-lg overflow-hidden">
-          <div className="px-6 py-4 border-b border-gray-200">
+          <div className="px-6 py-4 border-b border-gray-200 flex items-center">
             <h2 className="text-xl font-semibold">Scan Results</h2>
+            {isScanning && <Loader2 className="animate-spin h-5 w-5 ml-3 text-indigo-600" />}
           </div>
           <div className="overflow-x-auto">
             <table className="min-w-full divide-y divide-gray-300">
@@ -98,11 +113,14 @@ export default function DependencyScanner({ token, onImported }) {
               </thead>
               <tbody className="divide-y divide-gray-200 bg-white">
                 {results.map(item => (
-                  <tr key={item.name}>
+                  <tr key={`${item.diff}-${item.name}`} className={item.diff === "removed" ? "text-gray-400 line-through" : ""}>
                     <td className="px-3 py-4">
-                      <input type="checkbox" checked={!!selected[item.name]} onChange={() => toggle(item.name)} />
+                      <input type="checkbox" disabled={item.diff === "removed"} checked={!!selected[item.name] && item.diff !== "removed"} onChange={() => toggle(item.name)} />
+                    </td>
+                    <td className="whitespace-nowrap px-3 py-4 text-sm">
+                      {item.name || "N/A"}
+                      {diffStyles[item.diff] && <span className={`ml-2 rounded-full px-2 py-0.5 text-xs font-medium no-underline ${diffStyles[item.diff]}`}>{item.diff}</span>}
                     </td>
-                    <td className="whitespace-nowrap px-3 py-4 text-sm">{item.name || "N/A"}</td>
                     <td className="whitespace-nowrap px-3 py-4 text-sm text-gray-500">{item.spec || "N/A"}</td>
                     <td className="whitespace-nowrap px-3 py-4 text-sm text-indigo-600">{item.pypi_url && item.latest_version ? (<a href={item.pypi_url} target="_blank" rel="noreferrer">{item.latest_version}</a>) : "N/A"}</td>
                     <td className="whitespace-nowrap px-3 py-4 text-sm text-gray-500">{item.release_date ? new Date(item.release_date).toLocaleDateString() : "N/A"}</td>
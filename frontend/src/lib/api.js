@@ -1,22 +1,58 @@
 const RAW_BACKEND = import.meta.env.VITE_API_URL || "http://localhost:8000";
 const BACKEND = RAW_BACKEND.endsWith("/") ? RAW_BACKEND.slice(0, -1) : RAW_BACKEND;
 
+// Last result and ETag per GET URL and token; sent back as If-None-Match and reused on 304
+const etagCache = new Map();
+
+async function conditionalFetch(url, options) {
+  const isGet = !options.method || options.method === "GET";
+  const key = isGet ? `${options.headers?.Authorization || ""} ${url}` : null;
+  const cached = key ? etagCache.get(key) : null;
+  const headers = cached ? { ...options.headers, "If-None-Match": cached.etag } : options.headers;
+  const res = await fetch(url, { ...options, headers });
+  return { res, key, cached: res.status === 304 && cached ? cached.result : undefined };
+}
+
+function rememberEtag(key, res, result) {
+  const etag = res.headers.get("ETag");
+  if (key && etag) etagCache.set(key, { etag, result });
+  return result;
+}
+
 async function apiRequest(endpoint, options = {}) {
   const path = endpoint.startsWith("/") ? endpoint : `/${endpoint}`;
   const url = `${BACKEND}${path}`;
   try {
-    const res = await fetch(url, options);
+    const { res, key, cached } = await conditionalFetch(url, options);
+    if (cached !== undefined) return cached;
     if (!res.ok) {
       const errorData = await res.json().catch(() => ({}));
       return { error: errorData.error || errorData.message || `HTTP ${res.status}`, status: res.status };
     }
     if (res.status === 204 || options.method === "DELETE") return { success: true };
-    return await res.json();
+    return rememberEtag(key, res, await res.json());
+  } catch (err) {
+    return { error: err.message || "Network error" };
+  }
+}
+
+// Paginated GET: the body is the page, the next page's cursor comes back in X-Next-Cursor
+async function apiRequestPage(endpoint, options = {}) {
+  try {
+    const { res, key, cached } = await conditionalFetch(`${BACKEND}${endpoint}`, options);
+    if (cached !== undefined) return cached;
+    if (!res.ok) {
+      const errorData = await res.json().catch(() => ({}));
+      return { error: errorData.error || errorData.message || `HTTP ${res.status}`, status: res.status };
+    }
+    return rememberEtag(key, res, { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") || null });
   } catch (err) {
     return { error: err.message || "Network error" };
   }
 }
 
+const withCursor = (path, cursor) => (cursor ? `${path}?cursor=${encodeURIComponent(cursor)}` : path);
+
 export const register = (name, email, password, role = "user", adminSecret = "") =>
   apiRequest("/register", {
     method: "POST",
@@ -29,28 +65,73 @@ export const login = (email, password, asRole = "") =>
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ email, password, as_role: asRole })
   });
+export const logout = (token) => apiRequest("/logout", { method: "POST", headers: { Authorization: `Bearer ${token}` } });
 export const me = (token) => apiRequest("/me", { headers: { Authorization: `Bearer ${token}` } });
 
-export const getReleases = (token) => apiRequest("/releases", { headers: { Authorization: `Bearer ${token}` } });
+export const getReleases = (token, cursor = null) =>
+  apiRequestPage(withCursor("/releases", cursor), { headers: { Authorization: `Bearer ${token}` } });
+export const searchReleases = (token, q, limit = 50) =>
+  apiRequest(`/releases/search?q=${encodeURIComponent(q)}&limit=${limit}`, { headers: { Authorization: `Bearer ${token}` } });
+export const getReleaseStats = (token) => apiRequest("/releases/stats", { headers: { Authorization: `Bearer ${token}` } });
 export const createRelease = (token, project_name, version, status) =>
   apiRequest("/releases", { method: "POST", headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` }, body: JSON.stringify({ project_name, version, status }) });
 export const updateReleaseStatus = (token, releaseId, status) =>
   apiRequest(`/releases/${releaseId}`, { method: "PATCH", headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` }, body: JSON.stringify({ status }) });
 export const deleteRelease = (token, releaseId) =>
   apiRequest(`/releases/${releaseId}`, { method: "DELETE", headers: { Authorization: `Bearer ${token}` } });
+// Batch variants: one request for many ids; the response has an outcome per id
+export const batchUpdateReleaseStatus = (token, ids, status) =>
+  apiRequest("/releases/batch/status", { method: "POST", headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` }, body: JSON.stringify({ ids, status }) });
+export const batchDeleteReleases = (token, ids) =>
+  apiRequest("/releases/batch/delete", { method: "POST", headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` }, body: JSON.stringify({ ids }) });
 
-export const scanFile = (token, file) => {
+// Streams /scan as NDJSON: onRow(index, row) fires per package as soon as it is enriched
+export async function scanFileStream(token, file, onRow) {
   const formData = new FormData();
   formData.append("file", file);
-  return apiRequest("/scan", { method: "POST", headers: { Authorization: `Bearer ${token}` }, body: formData });
-};
+  try {
+    const res = await fetch(`${BACKEND}/scan?stream=1`, {
+      method: "POST",
+      headers: { Authorization: `Bearer ${token}`, Accept: "application/x-ndjson" },
+      body: formData
+    });
+    if (!res.ok) {
+      const errorData = await res.json().catch(() => ({}));
+      return { error: errorData.error || errorData.message || `HTTP ${res.status}`, status: res.status };
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let summary = null;
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const msg = JSON.parse(line);
+      if (msg.summary) summary = msg.summary;
+      else onRow(msg.index, msg.row);
+    };
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let nl;
+      while ((nl = buffer.indexOf("\n")) >= 0) {
+        handleLine(buffer.slice(0, nl));
+        buffer = buffer.slice(nl + 1);
+      }
+    }
+    handleLine(buffer + decoder.decode());
+    return summary ? { summary } : { error: "Scan ended before all packages were reported" };
+  } catch (err) {
+    return { error: err.message || "Network error" };
+  }
+}
 
 export const importScanResults = (token, rows, status = "Planned") =>
   apiRequest("/releases/import-scan", { method: "POST", headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` }, body: JSON.stringify({ rows, status }) });
 
 // Admin API
-export const adminListUsers = (token) =>
-  apiRequest("/admin/users", { headers: { Authorization: `Bearer ${token}` } });
+export const adminListUsers = (token, cursor = null) =>
+  apiRequest(withCursor("/admin/users", cursor), { headers: { Authorization: `Bearer ${token}` } });
 
 export const adminSetUserRole = (token, userId, role) =>
   apiRequest(`/admin/users/${userId}/role`, { method: "PATCH", headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` }, body: JSON.stringify({ role }) });
@@ -6,17 +6,32 @@ export default function AdminPage({ token }) {
   const [users, setUsers] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const fetchedRef = useRef(false);
 
   const fetchUsers = useCallback(async () => {
     setIsLoading(true);
     setError("");
     const data = await adminListUsers(token);
-    if (data?.users) setUsers(data.users);
-    else setError(data?.error || "Failed to fetch users");
+    if (data?.users) {
+      setUsers(data.users);
+      setNextCursor(data.next_cursor || null);
+    } else setError(data?.error || "Failed to fetch users");
     setIsLoading(false);
   }, [token]);
 
+  const loadMore = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    const data = await adminListUsers(token, nextCursor);
+    if (data?.users) {
+      setUsers(prev => [...prev, ...data.users]);
+      setNextCursor(data.next_cursor || null);
+    } else setError(data?.error || "Failed to fetch users");
+    setIsLoadingMore(false);
+  };
+
   useEffect(() => {
     if (fetchedRef.current) return;
     fetchedRef.current = true;
@@ -64,6 +79,13 @@ export default function AdminPage({ token }) {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div className="px-6 py-4 border-t border-gray-200 text-center">
+                <button onClick={loadMore} disabled={isLoadingMore} className="text-sm font-medium text-indigo-600 hover:text-indigo-800 disabled:opacity-50">
+                  {isLoadingMore ? "Loading..." : "Load more"}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
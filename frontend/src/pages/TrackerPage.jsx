@@ -1,6 +1,6 @@
 import React, { useEffect, useState, useCallback, useRef } from "react";
 import { Loader2 } from "lucide-react";
-import { getReleases } from "../lib/api";
+import { getReleases, searchReleases } from "../lib/api";
 import NewReleaseForm from "../components/NewReleaseForm";
 import ReleaseItem from "../components/ReleaseItem";
 import DependencyScanner from "../components/DependencyScanner";
@@ -9,6 +9,10 @@ export default function TrackerPage({ user, token }) {
   const [releases, setReleases] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [query, setQuery] = useState("");
+  const [searchResults, setSearchResults] = useState(null);
   const fetchedRef = useRef(false);
 
   const fetchReleases = useCallback(async () => {
@@ -16,8 +20,10 @@ export default function TrackerPage({ user, token }) {
     setError("");
     try {
       const data = await getReleases(token);
-      if (Array.isArray(data)) setReleases(data);
-      else setError(data?.error || "Failed to fetch releases.");
+      if (Array.isArray(data?.items)) {
+        setReleases(data.items);
+        setNextCursor(data.nextCursor);
+      } else setError(data?.error || "Failed to fetch releases.");
     } catch (err) {
       setError(err.message);
     } finally {
@@ -25,15 +31,55 @@ export default function TrackerPage({ user, token }) {
     }
   }, [token]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    const data = await getReleases(token, nextCursor);
+    if (Array.isArray(data?.items)) {
+      setReleases(prev => [...prev, ...data.items]);
+      setNextCursor(data.nextCursor);
+    } else setError(data?.error || "Failed to fetch releases.");
+    setIsLoadingMore(false);
+  };
+
   useEffect(() => {
     if (fetchedRef.current) return;
     fetchedRef.current = true;
     fetchReleases();
   }, [fetchReleases]);
 
+  // Server-side index search, debounced; an empty box shows the paged listing again.
+  // A reply that lands after the query changed (or was cleared) is dropped.
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      const data = await searchReleases(token, q);
+      if (cancelled) return;
+      if (Array.isArray(data?.results)) setSearchResults(data.results);
+      else setError(data?.error || "Search failed.");
+    }, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query, token]);
+
+  const shown = searchResults ?? releases;
+
   const handleReleaseCreated = (newRelease) => setReleases([newRelease, ...releases]);
-  const handleReleaseDeleted = (releaseId) => setReleases(releases.filter(r => r.id !== releaseId));
-  const handleReleaseUpdated = (updatedRelease) => setReleases(releases.map(r => r.id === updatedRelease.id ? updatedRelease : r));
+  const handleReleaseDeleted = (releaseId) => {
+    setReleases(releases.filter(r => r.id !== releaseId));
+    setSearchResults(prev => prev && prev.filter(r => r.id !== releaseId));
+  };
+  const handleReleaseUpdated = (updatedRelease) => {
+    setReleases(releases.map(r => r.id === updatedRelease.id ? updatedRelease : r));
+    setSearchResults(prev => prev && prev.map(r => r.id === updatedRelease.id ? updatedRelease : r));
+  };
 
   return (
     <div className="max-w-6xl mx-auto py-10 px-4 sm:px-6 lg:px-8">
@@ -52,20 +98,36 @@ export default function TrackerPage({ user, token }) {
       )}
 
       <div className="mt-8 bg-white shadow-lg rounded-lg overflow-hidden">
-        <div className="px-6 py-4 border-b border-gray-200">
+        <div className="px-6 py-4 border-b border-gray-200 flex justify-between items-center gap-4">
           <h2 className="text-xl font-semibold">{user.role === "admin" ? "All Releases" : "Your Releases"}</h2>
+          <input
+            type="search"
+            value={query}
+            onChange={e => setQuery(e.target.value)}
+            placeholder="Search projects..."
+            className="w-64 px-3 py-2 border border-gray-300 rounded-md text-sm focus:outline-none focus:ring-indigo-500 focus:border-indigo-500"
+          />
         </div>
         {isLoading ? (
           <div className="flex justify-center items-center h-64"><Loader2 className="animate-spin h-8 w-8 text-indigo-600" /></div>
-        ) : releases.length === 0 ? (
+        ) : searchResults && searchResults.length === 0 ? (
+          <p className="text-center text-gray-500 py-10">No releases match "{query.trim()}".</p>
+        ) : shown.length === 0 ? (
           <p className="text-center text-gray-500 py-10">You don't have any releases yet. Add one above!</p>
         ) : (
           <ul className="divide-y divide-gray-200">
-            {releases.map(release => (
+            {shown.map(release => (
               <ReleaseItem key={release.id} release={release} token={token} onDelete={handleReleaseDeleted} onUpdate={handleReleaseUpdated} />
             ))}
           </ul>
         )}
+        {!isLoading && !searchResults && nextCursor && (
+          <div className="px-6 py-4 border-t border-gray-200 text-center">
+            <button onClick={loadMore} disabled={isLoadingMore} className="text-sm font-medium text-indigo-600 hover:text-indigo-800 disabled:opacity-50">
+              {isLoadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
 
       <div className="mt-8"><DependencyScanner token={token} onImported={fetchReleases} /></div>